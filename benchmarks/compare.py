@@ -0,0 +1,84 @@
+from typing import Any
+
+# Metrics compared against the baseline and whether higher values are better
+COMPARED_METRICS = {"p50_ms": False, "p95_ms": False, "throughput_rps": True}
+# Rise in the share of failed requests that counts as a regression. It is an
+# absolute difference, since a healthy baseline usually has no errors at all.
+ERROR_RATE_TOLERANCE = 0.001
+
+
+def error_rate(result: dict[str, Any]) -> float | None:
+    """
+    Failed requests over all requests; "requests" counts only successes.
+    """
+    requests = result.get("requests")
+    errors = result.get("errors")
+    if requests is None or errors is None:
+        return None
+    total = requests + errors
+    return errors / total if total else 0.0
+
+
+def compare(
+    baseline: dict[str, Any], current: dict[str, Any], threshold: float
+) -> list[dict[str, Any]]:
+    """
+    Compares the benchmarks present in both result documents.
+
+    A metric regresses when it is worse than the baseline by more than
+    threshold (a fraction, e.g. 0.1 for 10%). Returns one row per compared
+    metric with its relative change, where positive always means worse.
+    The error rate's change is absolute and regresses past
+    ERROR_RATE_TOLERANCE instead.
+    """
+    rows: list[dict[str, Any]] = []
+    baseline_results = baseline.get("results", {})
+    for name, result in current.get("results", {}).items():
+        reference = baseline_results.get(name)
+        if reference is None:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            before = reference.get(metric)
+            after = result.get(metric)
+            if not before or after is None:
+                continue
+            worse_by = before - after if higher_is_better else after - before
+            change = worse_by / before
+            rows.append(
+                {
+                    "benchmark": name,
+                    "metric": metric,
+                    "baseline": before,
+                    "current": after,
+                    "change": change,
+                    "regression": change > threshold,
+                }
+            )
+        before_rate = error_rate(reference)
+        after_rate = error_rate(result)
+        if before_rate is not None and after_rate is not None:
+            rows.append(
+                {
+                    "benchmark": name,
+                    "metric": "error_rate",
+                    "baseline": before_rate,
+                    "current": after_rate,
+                    "change": after_rate - before_rate,
+                    "regression": after_rate - before_rate > ERROR_RATE_TOLERANCE,
+                }
+            )
+    return rows
+
+
+def format_rows(rows: list[dict[str, Any]]) -> str:
+    lines = [
+        f"{'benchmark':<24} {'metric':<15} {'baseline':>10} {'current':>10}  change"
+    ]
+    for row in rows:
+        flag = "  REGRESSION" if row["regression"] else ""
+        lines.append(
+            f"{row['benchmark']:<24} {row['metric']:<15} "
+            f"{row['baseline']:>10.2f} {row['current']:>10.2f} "
+            f"{row['change']:+7.1%}{flag}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,107 @@
+import json
+import math
+import random
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from src.main import MAX_FILE_SIZE_BYTES
+
+SCALES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+FILES_PER_DIR = 1_000
+EXTENSIONS = (".txt", ".md", ".log", ".py")
+MIN_FILE_SIZE_BYTES = 64
+DATA_DIR_NAME = "app_data"
+
+# (share of files, upper size bound): mostly small files with a long tail up to
+# the server's limit, which keeps a 1m tree at a few GB instead of ~60 GB
+SIZE_TIERS = (
+    (0.90, 8 * 1024),
+    (0.09, 64 * 1024),
+    (0.01, MAX_FILE_SIZE_BYTES),
+)
+
+WORDS = (
+    "context orchestrator trace span file read write list plan task tool cache "
+    "retry index journal schema hermes server client request response latency"
+).split()
+
+
+@dataclass(frozen=True)
+class Manifest:
+    files: int
+    seed: int
+    total_bytes: int
+
+
+def file_path(index: int) -> str:
+    """
+    Relative path of the index-th generated file; stable for a given index.
+    """
+    extension = EXTENSIONS[index % len(EXTENSIONS)]
+    return f"d{index // FILES_PER_DIR:04d}/f{index:07d}{extension}"
+
+
+def file_size(rng: random.Random) -> int:
+    """
+    Draws a size log-uniformly within a tier picked by SIZE_TIERS shares.
+    """
+    roll = rng.random()
+    lower = MIN_FILE_SIZE_BYTES
+    for share, upper in SIZE_TIERS:
+        if roll < share:
+            break
+        roll -= share
+        lower = upper
+    return int(math.exp(rng.uniform(math.log(lower), math.log(upper))))
+
+
+def _text_block(rng: random.Random) -> str:
+    # ASCII only, so a slice of n characters is a file of n bytes
+    words: list[str] = []
+    length = 0
+    while length < MAX_FILE_SIZE_BYTES * 2:
+        word = rng.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+        if len(words) % 12 == 0:
+            words.append("\n")
+    return " ".join(words)
+
+
+def load_manifest(root: Path) -> Manifest | None:
+    try:
+        with open(root / "manifest.json", encoding="utf-8") as f:
+            return Manifest(**json.load(f))
+    except (FileNotFoundError, TypeError, ValueError):
+        return None
+
+
+def generate(root: Path, files: int, seed: int = 0) -> Manifest:
+    """
+    Generates a synthetic app_data tree of `files` text files under root.
+
+    The tree is reused when root already holds one with the same file count
+    and seed, since writing the larger scales takes minutes.
+    """
+    existing = load_manifest(root)
+    if existing is not None and (existing.files, existing.seed) == (files, seed):
+        return existing
+
+    rng = random.Random(seed)
+    block = _text_block(rng)
+    data_dir = root / DATA_DIR_NAME
+    total_bytes = 0
+    for index in range(files):
+        path = data_dir / file_path(index)
+        if index % FILES_PER_DIR == 0:
+            path.parent.mkdir(parents=True, exist_ok=True)
+        size = file_size(rng)
+        offset = rng.randrange(len(block) - size)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(block[offset : offset + size])
+        total_bytes += size
+
+    manifest = Manifest(files=files, seed=seed, total_bytes=total_bytes)
+    with open(root / "manifest.json", "w", encoding="utf-8") as f:
+        json.dump(asdict(manifest), f)
+    return manifest
@@ -0,0 +1,146 @@
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+REPO_ROOT = Path(__file__).parent.parent
+SERVER_START_TIMEOUT_SECONDS = 30.0
+# Admission limits of the benchmarked server, pinned so results depend neither
+# on the caller's environment nor on later changes to the server's defaults.
+# Requests it rejects count as errors.
+SERVER_ADMISSION_ENV = {
+    "MCP_CONCURRENCY_LIST": "4:16",
+    "MCP_CONCURRENCY_SEARCH": "8:32",
+    "MCP_CONCURRENCY_READ": "64:256",
+    "MCP_CONCURRENCY_WRITE": "16:64",
+    "MCP_QUEUE_TIMEOUT_SECONDS": "1",
+    # The load comes from one client, which the per-client rate limit would cap
+    "MCP_RATE_LIMIT": "0",
+}
+
+# One request of a load scenario: (client, worker index, request number)
+Request = Callable[[httpx.AsyncClient, int, int], Awaitable[httpx.Response]]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return int(s.getsockname()[1])
+
+
+@contextmanager
+def run_server(base_dir: Path, port: int | None = None) -> Iterator[str]:
+    """
+    Starts the MCP server on base_dir in a subprocess and yields its URL.
+    """
+    port = port or free_port()
+    env = {**os.environ, **SERVER_ADMISSION_ENV, "MCP_BASE_DIR": str(base_dir)}
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "--factory",
+            "src.main:create_app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ],
+        cwd=REPO_ROOT,
+        env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        _wait_until_ready(url, process)
+        yield url
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def _wait_until_ready(url: str, process: subprocess.Popen[bytes]) -> None:
+    deadline = time.monotonic() + SERVER_START_TIMEOUT_SECONDS
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            httpx.get(f"{url}/", timeout=1.0)
+            return
+        except httpx.TransportError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Server did not start within {SERVER_START_TIMEOUT_SECONDS}s")
+
+
+def summarize(latencies: list[float], errors: int, elapsed: float) -> dict[str, Any]:
+    """
+    Latency percentiles in milliseconds and throughput in requests/second.
+    """
+    ordered = sorted(latencies)
+
+    def percentile(p: float) -> float:
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000
+
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "throughput_rps": len(ordered) / elapsed if elapsed else 0.0,
+        "mean_ms": statistics.fmean(ordered) * 1000 if ordered else 0.0,
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+        "max_ms": ordered[-1] * 1000 if ordered else 0.0,
+    }
+
+
+async def run_load(
+    url: str, request: Request, concurrency: int, duration: float
+) -> dict[str, Any]:
+    """
+    Runs `concurrency` workers issuing requests back to back for `duration`.
+
+    Each worker first sends one unmeasured request to open its connection.
+    Requests that raise or answer with a status >= 400 count as errors.
+    """
+    latencies: list[float] = []
+    errors = 0
+    limits = httpx.Limits(max_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60.0) as client:
+
+        async def worker(index: int, deadline: float) -> None:
+            nonlocal errors
+            number = 0
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    response = await request(client, index, number)
+                    failed = response.status_code >= 400
+                except httpx.HTTPError:
+                    failed = True
+                if failed:
+                    errors += 1
+                else:
+                    latencies.append(time.perf_counter() - start)
+                number += 1
+
+        await asyncio.gather(*(request(client, i, -1) for i in range(concurrency)))
+        start = time.perf_counter()
+        deadline = start + duration
+        await asyncio.gather(*(worker(i, deadline) for i in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return summarize(latencies, errors, elapsed)
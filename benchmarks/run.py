@@ -0,0 +1,212 @@
+"""
+Benchmarks the MCP endpoints and orchestrate() against a locally started server.
+
+    python -m benchmarks.run run --scale 1k
+    python -m benchmarks.run compare benchmarks/baseline.json results.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+from benchmarks.compare import compare, format_rows
+from benchmarks.dataset import (
+    DATA_DIR_NAME,
+    SCALES,
+    Manifest,
+    file_path,
+    file_size,
+    generate,
+)
+from benchmarks.harness import run_load, run_server, summarize
+
+DEFAULT_DATA_ROOT = Path(".bench_data")
+DEFAULT_RESULTS_DIR = Path("benchmarks/results")
+PLAN_WIDTHS = (1, 8, 32)
+WRITE_DIR = "bench_writes"
+WRITE_SLOTS = 16
+
+
+async def bench_endpoints(
+    url: str, manifest: Manifest, args: argparse.Namespace
+) -> dict[str, Any]:
+    rng = random.Random(manifest.seed)
+    read_paths = [file_path(rng.randrange(manifest.files)) for _ in range(1_000)]
+    write_bodies = [{"content": "x" * file_size(rng)} for _ in range(WRITE_SLOTS)]
+    list_params = {"max_items": args.list_max_items} if args.list_max_items else {}
+
+    def list_files(client: httpx.AsyncClient, worker: int, n: int):
+        return client.get("/list_files", params=list_params)
+
+    def read_file(client: httpx.AsyncClient, worker: int, n: int):
+        path = read_paths[(worker * 7919 + n) % len(read_paths)]
+        return client.get("/read_file", params={"file_path": path})
+
+    def write_file(client: httpx.AsyncClient, worker: int, n: int):
+        # Workers overwrite their own slots, so writes never race on one file
+        slot = n % WRITE_SLOTS
+        return client.post(
+            "/write_file",
+            params={"file_path": f"{WRITE_DIR}/w{worker}_{slot}.txt"},
+            json=write_bodies[slot],
+        )
+
+    results = {}
+    for name, request in (
+        ("list_files", list_files),
+        ("read_file", read_file),
+        ("write_file", write_file),
+    ):
+        print(f"  {name} ...", file=sys.stderr)
+        results[name] = await run_load(url, request, args.concurrency, args.duration)
+    return results
+
+
+def make_plan(width: int, rng: random.Random, files: int) -> str:
+    tasks = [
+        {
+            "id": f"t{i}",
+            "title": f"read {i}",
+            "tool": "read_file",
+            "args": {"file_path": file_path(rng.randrange(files))},
+        }
+        for i in range(width)
+    ]
+    return json.dumps({"meta": {"version": "1.0", "intent": "bench"}, "tasks": tasks})
+
+
+async def bench_orchestrate(
+    url: str, manifest: Manifest, args: argparse.Namespace
+) -> dict[str, Any]:
+    # TOOL_SOURCES is read at import, so the URL has to be set first
+    os.environ["MCP_BASE_URL"] = url
+    from src.orchestrator import orchestrate
+
+    rng = random.Random(manifest.seed)
+    results = {}
+    for width in PLAN_WIDTHS:
+        print(f"  orchestrate width={width} ...", file=sys.stderr)
+        latencies: list[float] = []
+        errors = 0
+        start = time.perf_counter()
+        for _ in range(args.orchestrate_runs):
+            plan = make_plan(width, rng, manifest.files)
+            run_start = time.perf_counter()
+            if await orchestrate(plan) == 0:
+                latencies.append(time.perf_counter() - run_start)
+            else:
+                errors += 1
+        summary = summarize(latencies, errors, time.perf_counter() - start)
+        results[f"orchestrate_width_{width}"] = summary
+    return results
+
+
+def run(args: argparse.Namespace) -> int:
+    files = SCALES[args.scale]
+    data_root = args.data_root / args.scale
+    print(f"Preparing {files} files in {data_root} ...", file=sys.stderr)
+    manifest = generate(data_root, files, args.seed)
+    base_dir = data_root / DATA_DIR_NAME
+
+    results: dict[str, Any] = {}
+    try:
+        with run_server(base_dir) as url:
+            results.update(asyncio.run(bench_endpoints(url, manifest, args)))
+            results.update(asyncio.run(bench_orchestrate(url, manifest, args)))
+    finally:
+        # Keeps the tree identical between runs
+        shutil.rmtree(base_dir / WRITE_DIR, ignore_errors=True)
+
+    document = {
+        "meta": {
+            "scale": args.scale,
+            "files": manifest.files,
+            "total_bytes": manifest.total_bytes,
+            "seed": manifest.seed,
+            "concurrency": args.concurrency,
+            "duration_seconds": args.duration,
+            "orchestrate_runs": args.orchestrate_runs,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "results": results,
+    }
+    output = args.output or DEFAULT_RESULTS_DIR / (
+        f"{args.scale}-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2)
+    print(f"Wrote {output}", file=sys.stderr)
+
+    if args.baseline is not None:
+        return compare_files(args.baseline, output, args.threshold)
+    return 0
+
+
+def compare_files(baseline_path: Path, current_path: Path, threshold: float) -> int:
+    """
+    Prints the comparison and returns 1 when any metric regressed.
+    """
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(current_path, encoding="utf-8") as f:
+        current = json.load(f)
+    if baseline.get("meta", {}).get("scale") != current.get("meta", {}).get("scale"):
+        print("Warning: baseline was recorded at another scale", file=sys.stderr)
+    rows = compare(baseline, current, threshold)
+    print(format_rows(rows))
+    return 1 if any(row["regression"] for row in rows) else 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the benchmarks")
+    run_parser.add_argument("--scale", choices=SCALES, default="1k")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--concurrency", type=int, default=16)
+    run_parser.add_argument(
+        "--duration", type=float, default=10.0, help="Seconds per endpoint"
+    )
+    run_parser.add_argument("--orchestrate-runs", type=int, default=20)
+    run_parser.add_argument(
+        "--list-max-items",
+        type=int,
+        help="max_items for /list_files (default: the full listing)",
+    )
+    run_parser.add_argument("--data-root", type=Path, default=DEFAULT_DATA_ROOT)
+    run_parser.add_argument("--output", type=Path)
+    run_parser.add_argument("--baseline", type=Path, help="Compare after running")
+    run_parser.add_argument("--threshold", type=float, default=0.2)
+
+    compare_parser = commands.add_parser("compare", help="Compare two result files")
+    compare_parser.add_argument("baseline", type=Path)
+    compare_parser.add_argument("current", type=Path)
+    compare_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="Allowed slowdown as a fraction (default: 0.2)",
+    )
+
+    args = parser.parse_args(argv)
+    if args.command == "compare":
+        return compare_files(args.baseline, args.current, args.threshold)
+    return run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
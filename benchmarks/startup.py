@@ -0,0 +1,195 @@
+"""
+Measures the cold start of the CLI and server entry points with -X importtime.
+
+    python -m benchmarks.startup               # fails when over a budget
+    python -m benchmarks.startup --top 15 --runs 9
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from benchmarks.harness import REPO_ROOT
+
+NOOP_HERMES_OUTPUT = json.dumps({"thought": "", "tool_calls": [], "final_answer": ""})
+READ_HERMES_OUTPUT = json.dumps(
+    {
+        "thought": "",
+        "tool_calls": [{"tool_name": "read_file", "args": {"file_path": "a.txt"}}],
+        "final_answer": "",
+    }
+)
+# Interpreter arguments per scenario
+SCENARIOS = {
+    "cli_help": ["-m", "src.cli", "--help"],
+    "cli_noop": ["-m", "src.cli", "--hermes-output", NOOP_HERMES_OUTPUT],
+    # Nothing listens on the port, so only the startup path is measured
+    "cli_tool_call": ["-m", "src.cli", "--hermes-output", READ_HERMES_OUTPUT],
+    "server_import": ["-c", "import src.main"],
+    "server_app": ["-c", "import src.main; src.main.app"],
+}
+# Exit code each scenario must end with; any other is a broken run, not a timing
+EXPECTED_EXIT_CODES = {"cli_tool_call": 1}
+# Import time in ms of the entry point, after interpreter startup. A CLI run used to load
+# httpx, yaml and their dependencies before parsing its arguments (~160 ms
+# even for --help), which the budgets keep from creeping back in.
+BUDGETS_MS = {
+    "cli_help": 25.0,
+    "cli_noop": 120.0,
+    "cli_tool_call": 350.0,
+}
+DEFAULT_RUNS = 5
+
+
+@dataclass(frozen=True)
+class ImportRecord:
+    depth: int
+    self_us: int
+    cumulative_us: int
+    module: str
+
+
+def parse_importtime(stderr: str) -> list[ImportRecord]:
+    """
+    Parses the "import time: self | cumulative | module" lines of -X importtime.
+    Nesting is given by two spaces of indentation per level.
+    """
+    records = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        if not self_us.strip().isdigit():
+            continue  # The header line
+        module = name.lstrip(" ")
+        depth = (len(name) - len(module) - 1) // 2
+        records.append(ImportRecord(depth, int(self_us), int(cumulative_us), module))
+    return records
+
+
+def entry_point_records(records: list[ImportRecord]) -> list[ImportRecord]:
+    """
+    Drops the imports of interpreter startup, which finish with `site`.
+    """
+    site = [i for i, r in enumerate(records) if r.depth == 0 and r.module == "site"]
+    return records[site[-1] + 1 :] if site else records
+
+
+def total_import_ms(records: list[ImportRecord]) -> float:
+    return sum(r.cumulative_us for r in records if r.depth == 0) / 1000
+
+
+def breakdown(records: list[ImportRecord], top: int) -> list[tuple[str, float]]:
+    """
+    Self time in ms summed per top-level package, largest first.
+    """
+    per_package: Counter[str] = Counter()
+    for record in records:
+        per_package[record.module.split(".")[0]] += record.self_us
+    return [(name, us / 1000) for name, us in per_package.most_common(top)]
+
+
+def run_once(
+    args: list[str], expected_exit_code: int = 0
+) -> tuple[float, list[ImportRecord]]:
+    # The tool call must fail fast instead of reaching a real server
+    env = {**os.environ, "MCP_BASE_URL": "http://127.0.0.1:9"}
+    env.pop("TRACE_FILE", None)
+    # Deployed code starts from cached bytecode, not by compiling every module
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        cwd=REPO_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+    if completed.returncode != expected_exit_code:
+        tail = "\n".join(completed.stderr.splitlines()[-5:])
+        raise RuntimeError(
+            f"{' '.join(args)} exited with code {completed.returncode}, "
+            f"expected {expected_exit_code}:\n{tail}"
+        )
+    return wall_ms, entry_point_records(parse_importtime(completed.stderr))
+
+
+def measure(runs: int, top: int) -> dict[str, Any]:
+    # Warms the bytecode cache, so every run measures a cached start
+    run_once(["-c", "import src.main, src.cli, src.orchestrator"])
+    interpreter_ms = min(run_once(["-c", "pass"])[0] for _ in range(runs))
+
+    results: dict[str, Any] = {}
+    for name, args in SCENARIOS.items():
+        print(f"  {name} ...", file=sys.stderr)
+        walls: list[float] = []
+        imports: list[float] = []
+        last_records: list[ImportRecord] = []
+        for _ in range(runs):
+            wall_ms, last_records = run_once(args, EXPECTED_EXIT_CODES.get(name, 0))
+            walls.append(wall_ms)
+            imports.append(total_import_ms(last_records))
+        # Noise only ever adds time, so the fastest run is the most repeatable
+        results[name] = {
+            "wall_ms": min(walls),
+            "import_ms": min(imports),
+            "budget_ms": BUDGETS_MS.get(name),
+            "top_packages": breakdown(last_records, top),
+        }
+    return {"interpreter_wall_ms": interpreter_ms, "scenarios": results}
+
+
+def format_results(document: dict[str, Any]) -> str:
+    lines = [
+        f"Bare interpreter: {document['interpreter_wall_ms']:.1f} ms wall",
+        f"{'scenario':<16}{'wall ms':>10}{'import ms':>11}{'budget':>9}",
+    ]
+    for name, result in document["scenarios"].items():
+        budget = result["budget_ms"]
+        over = budget is not None and result["import_ms"] > budget
+        lines.append(
+            f"{name:<16}{result['wall_ms']:>10.1f}{result['import_ms']:>11.1f}"
+            f"{budget if budget is not None else '-':>9}"
+            + ("  OVER BUDGET" if over else "")
+        )
+        packages = ", ".join(f"{p} {ms:.1f}" for p, ms in result["top_packages"])
+        lines.append(f"{'':<16}{packages}")
+    return "\n".join(lines)
+
+
+def over_budget(document: dict[str, Any]) -> list[str]:
+    return [
+        name
+        for name, result in document["scenarios"].items()
+        if result["budget_ms"] is not None and result["import_ms"] > result["budget_ms"]
+    ]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS)
+    parser.add_argument(
+        "--top", type=int, default=8, help="Packages listed per scenario"
+    )
+    parser.add_argument("--output", type=Path, help="Also write the results as JSON")
+    args = parser.parse_args(argv)
+
+    document = measure(args.runs, args.top)
+    print(format_results(document))
+    if args.output is not None:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(document, f, indent=2)
+    return 1 if over_budget(document) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
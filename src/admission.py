@@ -0,0 +1,188 @@
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+# Default (in-flight limit, queue length) per endpoint class. Listing walks the
+# whole tree, so few may run at once; reads are cheap and get the most room.
+DEFAULT_LIMITS = {
+    "list": (4, 16),
+    "search": (8, 32),
+    "read": (64, 256),
+    "write": (16, 64),
+}
+DEFAULT_QUEUE_TIMEOUT_SECONDS = 1.0
+DEFAULT_RATE_LIMIT = 50.0
+DEFAULT_RATE_BURST = 100.0
+MAX_RATE_LIMIT_KEYS = 10_000
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is refused before it reaches its endpoint."""
+
+    def __init__(self, status_code: int, retry_after: float, reason: str):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.reason = reason
+
+    @property
+    def retry_after_header(self) -> str:
+        # Retry-After takes whole seconds; rounding up never invites an early retry
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class TokenBucket:
+    """
+    Allows `rate` requests per second on average and bursts of up to `burst`.
+    """
+
+    def __init__(self, rate: float, burst: float) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated_at = time.monotonic()
+
+    def try_acquire(self) -> float:
+        """
+        Takes a token and returns 0, or returns the seconds until one is free.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """
+    One token bucket per key. The least recently used buckets are dropped
+    beyond max_keys, so unique keys cannot grow memory without bound.
+    """
+
+    def __init__(
+        self, rate: float, burst: float, max_keys: int = MAX_RATE_LIMIT_KEYS
+    ) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, TokenBucket] = OrderedDict()
+
+    def check(self, key: str) -> None:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.rate, self.burst)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        wait = bucket.try_acquire()
+        if wait:
+            raise AdmissionRejected(429, wait, "rate limited")
+
+
+class ConcurrencyLimiter:
+    """
+    Lets `limit` requests run at once and up to `queue_size` wait in FIFO order.
+
+    Requests arriving at a full queue, or waiting longer than queue_timeout,
+    are rejected at once instead of piling up behind a slow endpoint.
+    """
+
+    def __init__(self, limit: int, queue_size: int, queue_timeout: float) -> None:
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._waiters: deque[asyncio.Future[None]] = deque()
+
+    async def acquire(self) -> None:
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            return
+        if len(self._waiters) >= self.queue_size:
+            raise AdmissionRejected(503, self.queue_timeout, "queue full")
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except TimeoutError:
+            if not waiter.done():
+                self._waiters.remove(waiter)
+                raise AdmissionRejected(503, self.queue_timeout, "queue timeout")
+            # The slot was handed over just as the wait timed out; use it
+        except BaseException:
+            if waiter.done():
+                self.release()
+            else:
+                self._waiters.remove(waiter)
+            raise
+
+    def release(self) -> None:
+        if self._waiters:
+            # The slot passes straight to the next waiter, so in_flight is unchanged
+            self._waiters.popleft().set_result(None)
+        else:
+            self.in_flight -= 1
+
+
+class AdmissionController:
+    """
+    Applies the per-key rate limit, then the endpoint class's concurrency limit.
+    """
+
+    def __init__(
+        self,
+        limiters: dict[str, ConcurrencyLimiter],
+        rate_limiter: RateLimiter | None = None,
+    ) -> None:
+        self.limiters = limiters
+        self.rate_limiter = rate_limiter
+
+    @asynccontextmanager
+    async def admit(self, endpoint_class: str | None, key: str) -> AsyncIterator[None]:
+        """
+        Holds a slot for the enclosed block; raises AdmissionRejected instead.
+        Requests outside any endpoint class (e.g. /metrics) are always admitted.
+        """
+        limiter = self.limiters.get(endpoint_class) if endpoint_class else None
+        if limiter is None:
+            yield
+            return
+        if self.rate_limiter is not None:
+            self.rate_limiter.check(key)
+        await limiter.acquire()
+        try:
+            yield
+        finally:
+            limiter.release()
+
+
+def create_admission_controller() -> AdmissionController:
+    """
+    Builds the controller from the environment:
+    MCP_CONCURRENCY_<CLASS>="limit:queue" (e.g. MCP_CONCURRENCY_LIST=4:16),
+    MCP_QUEUE_TIMEOUT_SECONDS, and MCP_RATE_LIMIT / MCP_RATE_BURST in requests
+    per second per key (MCP_RATE_LIMIT=0 disables rate limiting).
+    """
+    queue_timeout = float(
+        os.environ.get("MCP_QUEUE_TIMEOUT_SECONDS", DEFAULT_QUEUE_TIMEOUT_SECONDS)
+    )
+    limiters = {}
+    for endpoint_class, (limit, queue_size) in DEFAULT_LIMITS.items():
+        configured = os.environ.get(f"MCP_CONCURRENCY_{endpoint_class.upper()}")
+        if configured:
+            limit_text, _, queue_text = configured.partition(":")
+            limit = int(limit_text)
+            queue_size = int(queue_text) if queue_text else queue_size
+        limiters[endpoint_class] = ConcurrencyLimiter(limit, queue_size, queue_timeout)
+
+    rate = float(os.environ.get("MCP_RATE_LIMIT", DEFAULT_RATE_LIMIT))
+    burst = float(os.environ.get("MCP_RATE_BURST", DEFAULT_RATE_BURST))
+    rate_limiter = RateLimiter(rate, burst) if rate > 0 else None
+    return AdmissionController(limiters, rate_limiter)
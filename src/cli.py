@@ -1,11 +1,8 @@
 import argparse
-import asyncio
 import sys
 
-from orchestrator import orchestrate
 
-
-async def main():
+def main():
     parser = argparse.ArgumentParser(
         description="Orchestrates tool calls based on Hermes output."
     )
@@ -17,6 +14,11 @@ async def main():
         "--hermes-output-file",
         help="Path to a file containing JSON output from Hermes.",
     )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Write a sampled stack profile of this run (folded format).",
+    )
 
     args = parser.parse_args()
 
@@ -29,9 +31,15 @@ async def main():
     else:
         parser.error("Either --hermes-output or --hermes-output-file must be provided.")
 
-    exit_code = await orchestrate(hermes_output_content)
+    # Imported only once there is work to do, so --help and usage errors
+    # return without loading asyncio, the orchestrator or its dependencies
+    import asyncio
+
+    from src.orchestrator import orchestrate
+
+    exit_code = asyncio.run(orchestrate(hermes_output_content, profile=args.profile))
     sys.exit(exit_code)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    main()
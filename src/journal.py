@@ -0,0 +1,192 @@
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+# Journals of runs that never committed or rolled back (e.g. a crashed
+# orchestrator) are dropped after this long
+JOURNAL_TTL_SECONDS = 3600.0
+ENTRIES_FILE = "entries.jsonl"
+BLOBS_DIR = "blobs"
+
+
+@dataclass(frozen=True)
+class _Entry:
+    path: str
+    op: str  # "create", "truncate" or "restore"
+    size: int | None = None  # truncate: the length before the append
+    blob: str | None = None  # restore: content hash of the prior content
+    created_dir: str | None = None  # create: outermost parent the write made
+
+
+class WriteJournal:
+    """
+    Trace-scoped undo journal for writes under root.
+
+    Before a journaled write the prior state of the file is recorded under
+    journal_dir/<trace>/: a created file is noted so undo can delete it,
+    along with any parent directories the write will create, an
+    append keeps only the length before it so undo is a truncate, and an
+    overwrite keeps the prior content as a blob named by its hash, so
+    identical contents are stored once. Only the first write to a path in a
+    trace needs undo data, except an overwrite after an append.
+
+    Rollback restores every touched file to its state before the trace;
+    commit drops the journal. Either way the cost follows the data changed.
+    """
+
+    def __init__(self, root: Path, journal_dir: Path) -> None:
+        self.root = root
+        self.journal_dir = journal_dir
+        # trace dir -> {path: "append" | "full"}, what its journal already covers
+        self._covered: dict[str, dict[str, str]] = {}
+
+    def _trace_dir(self, trace_id: str) -> Path:
+        # Trace ids come from a header, so they never become path components
+        digest = hashlib.sha256(trace_id.encode("utf-8")).hexdigest()[:32]
+        return self.journal_dir / digest
+
+    def _entries(self, trace_dir: Path) -> list[_Entry]:
+        try:
+            with open(trace_dir / ENTRIES_FILE, encoding="utf-8") as f:
+                return [_Entry(**json.loads(line)) for line in f if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    def _coverage(self, trace_dir: Path) -> dict[str, str]:
+        covered = self._covered.get(trace_dir.name)
+        if covered is None:
+            # Rebuilt from disk when the journal predates this process
+            covered = {}
+            for entry in self._entries(trace_dir):
+                covered[entry.path] = "append" if entry.op == "truncate" else "full"
+            self._covered[trace_dir.name] = covered
+        return covered
+
+    def _append_entry(self, trace_dir: Path, entry: _Entry) -> None:
+        trace_dir.mkdir(parents=True, exist_ok=True)
+        fields = {k: v for k, v in asdict(entry).items() if v is not None}
+        with open(trace_dir / ENTRIES_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(fields) + "\n")
+
+    def _store_blob(self, trace_dir: Path, content: bytes) -> str:
+        digest = hashlib.sha256(content).hexdigest()
+        blob = trace_dir / BLOBS_DIR / digest
+        if not blob.exists():
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            tmp_blob = blob.with_name(digest + ".tmp")
+            tmp_blob.write_bytes(content)
+            os.replace(tmp_blob, blob)
+        return digest
+
+    def _missing_parent(self, rel_path: str) -> str | None:
+        """
+        The outermost parent of rel_path that does not exist yet, if any.
+        """
+        missing = None
+        parent = Path(rel_path).parent
+        while parent != Path(".") and not (self.root / parent).exists():
+            missing = parent
+            parent = parent.parent
+        return missing.as_posix() if missing is not None else None
+
+    def _remove_created_dirs(self, directory: Path, created_dir: str) -> None:
+        # Bottom-up up to created_dir; a directory still holding files is kept
+        top = self.root / created_dir
+        while directory.is_relative_to(top):
+            try:
+                directory.rmdir()
+            except OSError:
+                return
+            directory = directory.parent
+
+    def record(self, trace_id: str, rel_path: str, append: bool) -> None:
+        """
+        Records how to undo a write to rel_path; call it before writing.
+        """
+        trace_dir = self._trace_dir(trace_id)
+        covered = self._coverage(trace_dir)
+        kind = covered.get(rel_path)
+        if kind == "full" or (kind == "append" and append):
+            return  # Undoing the earlier entry already restores the original
+        abs_path = self.root / rel_path
+        if not abs_path.exists():
+            entry = _Entry(
+                rel_path, "create", created_dir=self._missing_parent(rel_path)
+            )
+        elif append:
+            entry = _Entry(rel_path, "truncate", size=abs_path.stat().st_size)
+        else:
+            blob = self._store_blob(trace_dir, abs_path.read_bytes())
+            entry = _Entry(rel_path, "restore", blob=blob)
+        self._append_entry(trace_dir, entry)
+        covered[rel_path] = "append" if entry.op == "truncate" else "full"
+
+    def rollback(self, trace_id: str) -> list[str]:
+        """
+        Undoes the trace's writes and drops its journal.
+        Returns the restored paths; an unknown trace restores nothing.
+        """
+        trace_dir = self._trace_dir(trace_id)
+        # Per path, the first entry restores the original. The one exception
+        # is an append followed by an overwrite: restoring the overwrite's
+        # snapshot brings back the appended text, which the truncate removes.
+        first: dict[str, _Entry] = {}
+        full: dict[str, _Entry] = {}
+        for entry in self._entries(trace_dir):
+            first.setdefault(entry.path, entry)
+            if entry.op != "truncate":
+                full.setdefault(entry.path, entry)
+        for rel_path, entry in first.items():
+            abs_path = self.root / rel_path
+            snapshot = full.get(rel_path)
+            if snapshot is not None:
+                if snapshot.blob is None:  # Created within the trace
+                    abs_path.unlink(missing_ok=True)
+                    if snapshot.created_dir is not None:
+                        self._remove_created_dirs(abs_path.parent, snapshot.created_dir)
+                    continue
+                shutil.copyfile(trace_dir / BLOBS_DIR / snapshot.blob, abs_path)
+            if entry.op == "truncate":
+                with contextlib.suppress(FileNotFoundError):  # Deleted since
+                    os.truncate(abs_path, entry.size or 0)
+        self._drop(trace_dir)
+        return list(first)
+
+    def commit(self, trace_id: str) -> list[str]:
+        """
+        Keeps the trace's writes and drops its journal, along with any
+        journal abandoned for longer than JOURNAL_TTL_SECONDS.
+        Returns the paths the journal covered.
+        """
+        trace_dir = self._trace_dir(trace_id)
+        paths = list(dict.fromkeys(entry.path for entry in self._entries(trace_dir)))
+        self._drop(trace_dir)
+        self.expire()
+        return paths
+
+    def expire(self, ttl: float = JOURNAL_TTL_SECONDS) -> int:
+        """
+        Drops journals untouched for longer than ttl; returns how many.
+        """
+        if not self.journal_dir.is_dir():
+            return 0
+        cutoff = time.time() - ttl
+        expired = 0
+        for trace_dir in self.journal_dir.iterdir():
+            try:
+                modified = (trace_dir / ENTRIES_FILE).stat().st_mtime
+            except FileNotFoundError:
+                modified = trace_dir.stat().st_mtime
+            if modified < cutoff:
+                self._drop(trace_dir)
+                expired += 1
+        return expired
+
+    def _drop(self, trace_dir: Path) -> None:
+        self._covered.pop(trace_dir.name, None)
+        shutil.rmtree(trace_dir, ignore_errors=True)
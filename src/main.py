@@ -1,23 +1,153 @@
+import asyncio
+import hashlib
 import os
+import re
+import time
+import uuid
 from pathlib import Path
+from typing import Any
 
-from fastapi import Depends, FastAPI, Header, HTTPException, Response, status
+from fastapi import (
+    APIRouter,
+    Depends,
+    FastAPI,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from fastapi.responses import JSONResponse, PlainTextResponse
 from pydantic import BaseModel, Field
 
-app = FastAPI()
+from src.admission import (
+    AdmissionController,
+    AdmissionRejected,
+    create_admission_controller,
+)
+from src.journal import WriteJournal
+from src.profiling import maybe_profile, profile_settings
+from src.tracing import create_tracer
+from src.trigram_index import TrigramIndex
+from src.wire import MSGPACK_MEDIA_TYPE, WireFormat, compress, encode, negotiate
+
+router = APIRouter()
+tracer = create_tracer("mcp")
+# Built from the environment by create_app; until then nothing is limited
+admission = AdmissionController({})
 
 # Configuration constants
 ALLOWED_EXTENSIONS = {".txt", ".log", ".md", ".py", ".json", ".yml", ".yaml"}
 MAX_FILE_SIZE_BYTES = 512 * 1024  # 512 KB
-BASE_DIR = Path(__file__).parent.parent / "app_data"
+PROFILE_HEADER_ON = {"1", "true", "yes", "on"}
+# How long /grep waits for the first index build before answering 503
+INDEX_BUILD_WAIT_SECONDS = 2.0
+INDEX_BUILD_RETRY_AFTER = "2"
+# Endpoints sharing an admission limit; other paths are not limited
+ENDPOINT_CLASSES = {
+    "/list_files": "list",
+    "/grep": "search",
+    "/read_file": "read",
+    "/write_file": "write",
+    "/rollback": "write",
+    "/commit": "write",
+}
+
+
+def base_dir_from_env() -> Path:
+    # MCP_BASE_DIR points the server at another tree, e.g. a benchmark dataset
+    return Path(
+        os.environ.get("MCP_BASE_DIR", Path(__file__).parent.parent / "app_data")
+    ).resolve()
+
+
+BASE_DIR = base_dir_from_env()
+# Whether X-Profile forces a profile; off by default, since any client could
+# otherwise bypass PROFILE_SAMPLE_RATE and write a profile file per trace id
+PROFILE_HEADER_ENABLED = False
+
+_app: FastAPI | None = None
+_search_index: TrigramIndex | None = None
+_journal: WriteJournal | None = None
 
-# Ensure BASE_DIR exists
-BASE_DIR.mkdir(parents=True, exist_ok=True)
+
+async def trace_requests(request: Request, call_next):
+    """
+    Opens the root span for each request and records per-endpoint metrics.
+    A trace_id is generated when the caller did not send X-Trace-ID.
+    Requests sampled via PROFILE_SAMPLE_RATE, or sending X-Profile: 1 when
+    MCP_PROFILE_HEADER allows it, are profiled; the profile holds whatever
+    the event loop ran meanwhile, see maybe_profile.
+    Requests over their rate or concurrency limit are answered 429/503 with
+    Retry-After before reaching the endpoint.
+    """
+    caller_trace_id = request.headers.get("X-Trace-ID")
+    trace_id = caller_trace_id or str(uuid.uuid4())
+    start = time.perf_counter()
+    endpoint = "unmatched"
+    status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+    force_profile = (
+        PROFILE_HEADER_ENABLED
+        and request.headers.get("X-Profile", "").lower() in PROFILE_HEADER_ON
+    )
+    # Requests without a trace share their client's bucket
+    client_host = request.client.host if request.client else "unknown"
+    rate_key = caller_trace_id or client_host
+    try:
+        with (
+            tracer.span(request.method, trace_id=trace_id) as span,
+            maybe_profile(tracer, trace_id, force=force_profile),
+        ):
+            try:
+                async with admission.admit(
+                    ENDPOINT_CLASSES.get(request.url.path), rate_key
+                ):
+                    response = await call_next(request)
+                route = request.scope.get("route")
+                if route is not None:
+                    endpoint = route.path
+            except AdmissionRejected as e:
+                endpoint = request.url.path
+                span.set_attribute("admission.rejected", e.reason)
+                tracer.metrics.inc(
+                    "mcp_admission_rejected_total", endpoint=endpoint, reason=e.reason
+                )
+                response = JSONResponse(
+                    {"detail": f"Request rejected: {e.reason}"},
+                    status_code=e.status_code,
+                    headers={"Retry-After": e.retry_after_header},
+                )
+            status_code = response.status_code
+            span.name = f"{request.method} {endpoint}"
+            span.set_attribute("http.status_code", status_code)
+    finally:
+        tracer.metrics.observe(
+            "mcp_http_request_duration_seconds",
+            time.perf_counter() - start,
+            endpoint=endpoint,
+        )
+        tracer.metrics.inc(
+            "mcp_http_requests_total",
+            endpoint=endpoint,
+            method=request.method,
+            status=str(status_code),
+        )
+        tracer.flush()
+    response.headers["X-Trace-ID"] = trace_id
+    return response
 
 
 # Dependency to get trace_id
 async def get_trace_id(x_trace_id: str | None = Header(None)):
-    return x_trace_id
+    return x_trace_id or tracer.current_trace_id()
+
+
+# Dependency to pick the body encoding and compression of tool results
+async def get_wire_format(
+    accept: str | None = Header(None), accept_encoding: str | None = Header(None)
+) -> WireFormat:
+    return negotiate(accept, accept_encoding)
 
 
 # Pydantic models for request/response bodies
@@ -25,14 +155,30 @@ class FileContent(BaseModel):
     content: str = Field(..., description="File content in UTF-8")
 
 
+class GrepLineSpan(BaseModel):
+    path: str = Field(..., description="Relative to BASE_DIR")
+    span: str = Field(..., pattern=r"^L\d+-L\d+$", description="Matching lines")
+    text: str = Field(..., description="The matching lines, truncated")
+
+
+class GrepResponse(BaseModel):
+    matches: list[GrepLineSpan]
+    truncated: bool = Field(..., description="More matches than max_results")
+
+
 class FileListResponse(BaseModel):
     files: list[str] = Field(..., description="List of files")
 
 
+class JournalResponse(BaseModel):
+    files: list[str] = Field(..., description="Files the trace's journal covered")
+
+
 # Helper function for path validation
 def validate_path(file_path: str) -> Path:
     # Resolve the path to prevent directory traversal
-    abs_path = (BASE_DIR / file_path).resolve()
+    with tracer.span("validate_path"):
+        abs_path = (BASE_DIR / file_path).resolve()
     if not abs_path.is_relative_to(BASE_DIR):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Path traversal detected"
@@ -49,31 +195,126 @@ def validate_extension(file_path: Path):
         )
 
 
-@app.get("/")
-def read_root():
-    return {"Hello": "World"}
+# Helper functions for conditional requests
+def file_etag(abs_path: Path) -> str:
+    # mtime and size change on every write, so no content hashing is needed
+    stat = abs_path.stat()
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
 
 
-@app.get("/list_files")
-async def list_files(
-    extensions: str | None = None,
-    max_items: int | None = None,
-    trace_id: str = Depends(get_trace_id),
-) -> FileListResponse:
+def listing_etag(files: list[str]) -> str:
+    digest = hashlib.blake2b("\0".join(files).encode("utf-8"), digest_size=16)
+    return f'"{digest.hexdigest()}"'
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+
+# Serializes explicitly so the cost shows up as its own span
+def encoded_response(
+    model: BaseModel, wire: WireFormat, headers: dict[str, str] | None = None
+) -> Response:
     """
-    Lists files within the BASE_DIR, optionally filtered by extensions and limited by max_items.
+    Serializes model as JSON or MessagePack and compresses large bodies,
+    as negotiated from the request's Accept and Accept-Encoding headers.
     """
+    with tracer.span("serialize", media_type=wire.media_type):
+        if wire.media_type == MSGPACK_MEDIA_TYPE:
+            body = encode(model.model_dump(), wire)
+        else:
+            body = model.model_dump_json().encode()
+    response_headers = {**(headers or {}), "Vary": "Accept, Accept-Encoding"}
+    if wire.encoding is not None:
+        with tracer.span("compress", encoding=wire.encoding, size=len(body)):
+            body, content_encoding = compress(body, wire.encoding)
+        if content_encoding is not None:
+            response_headers["Content-Encoding"] = content_encoding
+    return Response(content=body, media_type=wire.media_type, headers=response_headers)
+
+
+def walk_files(base_dir: Path) -> list[str]:
     all_files = []
-    for root, _, files in os.walk(BASE_DIR):
+    for root, _, files in os.walk(base_dir):
         for file in files:
             relative_path = Path(root) / file
             try:
-                # Ensure the path is relative to BASE_DIR for consistent output
-                relative_path_str = str(relative_path.relative_to(BASE_DIR))
+                # Ensure the path is relative to base_dir for consistent output
+                relative_path_str = str(relative_path.relative_to(base_dir))
                 all_files.append(relative_path_str)
             except ValueError:
-                # This should not happen if os.walk starts from BASE_DIR
+                # This should not happen if os.walk starts from base_dir
                 continue
+    return all_files
+
+
+def get_search_index() -> TrigramIndex:
+    """
+    Returns the grep index of the current BASE_DIR. Its first refresh loads
+    the saved index off the event loop; it is persisted to MCP_INDEX_FILE, by
+    default .<dir>.trigrams beside BASE_DIR.
+    """
+    global _search_index
+    if _search_index is None or _search_index.root != BASE_DIR:
+        index_file = os.environ.get("MCP_INDEX_FILE") or BASE_DIR.with_name(
+            f".{BASE_DIR.name}.trigrams"
+        )
+        _search_index = TrigramIndex(
+            BASE_DIR, Path(index_file), ALLOWED_EXTENSIONS, MAX_FILE_SIZE_BYTES
+        )
+    return _search_index
+
+
+def get_journal() -> WriteJournal:
+    """
+    Returns the undo journal of the current BASE_DIR.
+    It is kept in MCP_JOURNAL_DIR, by default .<dir>.journal beside BASE_DIR.
+    """
+    global _journal
+    if _journal is None or _journal.root != BASE_DIR:
+        journal_dir = os.environ.get("MCP_JOURNAL_DIR") or BASE_DIR.with_name(
+            f".{BASE_DIR.name}.journal"
+        )
+        _journal = WriteJournal(BASE_DIR, Path(journal_dir))
+    return _journal
+
+
+def reindex(rel_paths: list[str]) -> None:
+    if _search_index is not None and _search_index.root == BASE_DIR:
+        with tracer.span("index", op="update", files=len(rel_paths)):
+            for rel_path in rel_paths:
+                _search_index.update_file(rel_path)
+
+
+@router.get("/")
+def read_root():
+    return {"Hello": "World"}
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def read_metrics() -> str:
+    """
+    Exposes request and span metrics in the Prometheus text format.
+    """
+    return tracer.metrics.render_prometheus()
+
+
+@router.get("/list_files", response_model=FileListResponse)
+async def list_files(
+    extensions: str | None = None,
+    max_items: int | None = None,
+    if_none_match: str | None = Header(None),
+    wire: WireFormat = Depends(get_wire_format),
+    trace_id: str = Depends(get_trace_id),
+) -> Response:
+    """
+    Lists files within the BASE_DIR, optionally filtered by extensions and limited by max_items.
+    Answers 304 when If-None-Match matches the ETag of the listing.
+    """
+    # Walked in a worker thread so a large tree does not stall the event loop;
+    # admission control bounds how many walks run at once
+    with tracer.span("disk_io", op="walk"):
+        all_files = await asyncio.to_thread(walk_files, BASE_DIR)
 
     # Filter by extensions
     if extensions:
@@ -84,15 +325,73 @@ async def list_files(
     if max_items is not None:
         all_files = all_files[:max_items]
 
-    return FileListResponse(files=all_files)
+    etag = listing_etag(all_files)
+    if if_none_match == etag:
+        return not_modified(etag)
+    return encoded_response(FileListResponse(files=all_files), wire, {"ETag": etag})
 
 
-@app.get("/read_file")
+@router.get("/grep", response_model=GrepResponse)
+async def grep(
+    pattern: str = Query(..., min_length=1, max_length=1000),
+    regex: bool = False,
+    ignore_case: bool = False,
+    path_prefix: str | None = None,
+    max_results: int = Query(100, ge=1, le=1000),
+    wire: WireFormat = Depends(get_wire_format),
+    trace_id: str = Depends(get_trace_id),
+) -> Response:
+    """
+    Searches the text files under BASE_DIR for a literal string or regex.
+    Only files sharing the pattern's trigrams are read. Files changed on disk
+    are picked up by a background rescan every few seconds. While the first
+    index build is still running it answers 503 with Retry-After.
+    """
+    index = get_search_index()
+    if not index.wait_ready(0):
+        # A partial index would silently miss matches, so wait for the build
+        index.refresh_in_background()
+        with tracer.span("index", op="build"):
+            ready = await asyncio.to_thread(index.wait_ready, INDEX_BUILD_WAIT_SECONDS)
+        if not ready:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Search index is still being built",
+                headers={"Retry-After": INDEX_BUILD_RETRY_AFTER},
+            )
+    elif index.needs_refresh():
+        index.refresh_in_background()
+
+    try:
+        with tracer.span("index", op="search"):
+            matches, truncated = await asyncio.to_thread(
+                index.search, pattern, regex, ignore_case, path_prefix, max_results
+            )
+    except re.error as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid regex: {e}"
+        )
+    return encoded_response(
+        GrepResponse(
+            matches=[
+                GrepLineSpan(path=m.path, span=m.span, text=m.text) for m in matches
+            ],
+            truncated=truncated,
+        ),
+        wire,
+    )
+
+
+@router.get("/read_file", response_model=FileContent)
 async def read_file(
-    file_path: str, trace_id: str = Depends(get_trace_id)
-) -> FileContent:
+    file_path: str,
+    if_none_match: str | None = Header(None),
+    wire: WireFormat = Depends(get_wire_format),
+    trace_id: str = Depends(get_trace_id),
+) -> Response:
     """
     Reads the content of a specified file.
+    Answers 304 when If-None-Match matches the file's current ETag.
     """
     abs_path = validate_path(file_path)
     validate_extension(abs_path)
@@ -102,10 +401,15 @@ async def read_file(
             status_code=status.HTTP_404_NOT_FOUND, detail="File not found"
         )
 
+    # Taken before reading so a concurrent write yields a stale, never a wrong, ETag
+    etag = file_etag(abs_path)
+    if if_none_match == etag:
+        return not_modified(etag)
+
     try:
-        with open(abs_path, encoding="utf-8") as f:
+        with tracer.span("disk_io", op="read"), open(abs_path, encoding="utf-8") as f:
             content = f.read()
-        return FileContent(content=content)
+        return encoded_response(FileContent(content=content), wire, {"ETag": etag})
     except UnicodeDecodeError:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="File is not UTF-8 encoded"
@@ -117,15 +421,18 @@ async def read_file(
         )
 
 
-@app.post("/write_file")
+@router.post("/write_file")
 async def write_file(
     file_path: str,
     file_content: FileContent,
     mode: str = "overwrite",  # Default to overwrite
+    x_journal: str | None = Header(None),
     trace_id: str = Depends(get_trace_id),
 ) -> Response:
     """
     Writes content to a specified file.
+    With X-Journal: 1 the prior state is journaled under the trace, so that
+    POST /rollback can undo the write.
     """
     abs_path = validate_path(file_path)
     validate_extension(abs_path)
@@ -146,11 +453,17 @@ async def write_file(
             detail="Invalid mode. Allowed modes are 'overwrite' and 'append'.",
         )
 
+    rel_path = str(abs_path.relative_to(BASE_DIR))
     try:
+        if x_journal == "1":
+            with tracer.span("journal", op="record"):
+                get_journal().record(trace_id, rel_path, append=mode == "append")
         # Ensure parent directories exist
-        abs_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(abs_path, open_mode, encoding="utf-8") as f:
-            f.write(file_content.content)
+        with tracer.span("disk_io", op="write"):
+            abs_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(abs_path, open_mode, encoding="utf-8") as f:
+                f.write(file_content.content)
+        reindex([rel_path])
         return Response(
             status_code=status.HTTP_200_OK, content="File written successfully"
         )
@@ -159,3 +472,58 @@ async def write_file(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error writing file: {e}",
         )
+
+
+@router.post("/rollback", response_model=JournalResponse)
+async def rollback(x_trace_id: str = Header(...)) -> JournalResponse:
+    """
+    Undoes the journaled writes of the trace in X-Trace-ID, restoring each
+    file to its state before the trace, and drops the journal.
+    """
+    with tracer.span("journal", op="rollback"):
+        files = get_journal().rollback(x_trace_id)
+    reindex(files)
+    return JournalResponse(files=files)
+
+
+@router.post("/commit", response_model=JournalResponse)
+async def commit(x_trace_id: str = Header(...)) -> JournalResponse:
+    """
+    Keeps the journaled writes of the trace in X-Trace-ID and drops its journal.
+    """
+    with tracer.span("journal", op="commit"):
+        files = get_journal().commit(x_trace_id)
+    return JournalResponse(files=files)
+
+
+def create_app() -> FastAPI:
+    """
+    Builds the MCP server app. Configuration (MCP_BASE_DIR, admission limits,
+    MCP_PROFILE_HEADER, profiling settings) is read from the environment here,
+    and BASE_DIR is created, rather than as a side effect of importing this
+    module.
+    Run it with `uvicorn --factory src.main:create_app`, or `src.main:app`.
+    """
+    global BASE_DIR, PROFILE_HEADER_ENABLED, admission
+    BASE_DIR = base_dir_from_env()
+    BASE_DIR.mkdir(parents=True, exist_ok=True)
+    admission = create_admission_controller()
+    PROFILE_HEADER_ENABLED = (
+        os.environ.get("MCP_PROFILE_HEADER", "").lower() in PROFILE_HEADER_ON
+    )
+    profile_settings.cache_clear()
+
+    app = FastAPI()
+    app.middleware("http")(trace_requests)
+    app.include_router(router)
+    return app
+
+
+def __getattr__(name: str) -> Any:
+    # `src.main:app` and `from src.main import app` build the app on first use
+    global _app
+    if name == "app":
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,10 +1,95 @@
+import asyncio
+import copy
+import functools
+import hashlib
 import json
+import os
+import pickle
+import posixpath
 import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
 from typing import Any
 
-import httpx
+from src.profiling import is_profiling, maybe_profile
+from src.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    LatencyTracker,
+    RetryPolicy,
+    call_with_resilience,
+)
+from src.schema_validation import SCHEMAS_DIR, SchemaValidationError, load_validator
+from src.tool_registry import ToolSpec, build_registry
+from src.tracing import Span, create_tracer
+from src.wire import accept_header
 
-MCP_BASE_URL = "http://localhost:8000"
+MCP_BASE_URL = os.environ.get("MCP_BASE_URL", "http://localhost:8000")
+RAG_BASE_URL = os.environ.get("RAG_BASE_URL", "http://localhost:8010")
+
+HERMES_RESPONSE_SCHEMA = "helmes_response.schema.json"
+PLAN_SCHEMA = "plan_v1.schema.json"
+
+# OpenAPI documents the tool registry is generated from, with their base URLs
+TOOL_SOURCES = (
+    ("mcp_server.openapi.yml", MCP_BASE_URL),
+    ("rag_server.openapi.yml", RAG_BASE_URL),
+)
+
+tracer = create_tracer("orchestrator")
+
+
+def retry_policy_from_env() -> RetryPolicy:
+    # MCP_HEDGE=1 duplicates idempotent calls slower than the recent p95
+    hedge = os.environ.get("MCP_HEDGE", "").lower() in {"1", "true", "yes", "on"}
+    return RetryPolicy(hedge=hedge)
+
+
+RETRY_POLICY = retry_policy_from_env()
+# Names used in error messages; a service at another URL is named by its URL
+SERVICE_NAMES = {RAG_BASE_URL: "RAG", MCP_BASE_URL: "MCP"}
+
+
+@dataclass
+class ServiceHealth:
+    name: str
+    breaker: CircuitBreaker = field(default_factory=CircuitBreaker)
+    latency: LatencyTracker = field(default_factory=LatencyTracker)
+
+
+# Shared across calls and kept per base URL, so one service's failures never
+# open another's circuit or skew its hedging delay
+SERVICES: dict[str, ServiceHealth] = {}
+
+
+def service_health(base_url: str) -> ServiceHealth:
+    health = SERVICES.get(base_url)
+    if health is None:
+        health = SERVICES[base_url] = ServiceHealth(
+            SERVICE_NAMES.get(base_url, base_url)
+        )
+    return health
+
+
+CACHE_FORMAT_VERSION = 1
+
+
+def cache_file_from_env() -> Path | None:
+    """
+    Where orchestrate() keeps its cache between processes, one file per MCP
+    URL under ORCHESTRATOR_CACHE_DIR; None (no persistence) when it is unset.
+    """
+    cache_dir = os.environ.get("ORCHESTRATOR_CACHE_DIR")
+    if not cache_dir:
+        return None
+    digest = hashlib.sha256(MCP_BASE_URL.encode("utf-8")).hexdigest()[:16]
+    return Path(cache_dir) / f"tool-results-{digest}.pickle"
+
+
+# Tools whose results depend only on their args and the state of app_data
+READ_ONLY_TOOLS = frozenset({"list_files", "read_file", "grep"})
+# Results that depend on every file, so any write may make them stale
+TREE_WIDE_TOOLS = frozenset({"list_files", "grep"})
 
 
 class OrchestratorError(Exception):
@@ -31,79 +116,475 @@ class ExecutionError(OrchestratorError):
     pass
 
 
-def extract_json_from_hermes_output(output: str) -> dict[str, Any]:
+@dataclass
+class _CacheEntry:
+    result: Any
+    etag: str | None
+    file_path: str | None
+    validated_in: str  # trace_id of the run that last confirmed the entry
+
+
+def _normalize_path(file_path: str) -> str:
+    return posixpath.normpath(file_path.lstrip("/"))
+
+
+class ToolResultCache:
     """
-    Extracts JSON from Hermes output, handling JSON fences and retrying once.
+    Client-side cache for read-only tool results.
+
+    Entries are keyed by (tool_name, canonicalized args). Within the run that
+    fetched or revalidated an entry it is served without a network call; an
+    entry carried over from an earlier run is revalidated once with
+    If-None-Match against the ETag the MCP returned. Results are stored and
+    served as copies, so callers may mutate what they get.
+
+    Entries carry over between runs that share the instance, or between
+    processes through save() and load().
+    """
+
+    def __init__(self) -> None:
+        self._entries: dict[tuple[str, str], _CacheEntry] = {}
+
+    @classmethod
+    def load(cls, path: Path) -> "ToolResultCache":
+        """
+        Loads a cache saved by save(); a missing or unreadable file gives an
+        empty cache.
+        """
+        cache = cls()
+        try:
+            with open(path, "rb") as f:
+                state: dict[str, Any] = pickle.load(f)
+        except Exception:
+            return cache
+        if state.get("version") == CACHE_FORMAT_VERSION:
+            cache._entries = state["entries"]
+        return cache
+
+    def save(self, path: Path) -> None:
+        """
+        Writes the entries that can be revalidated, i.e. those with an ETag.
+        """
+        state = {
+            "version": CACHE_FORMAT_VERSION,
+            "entries": {k: e for k, e in self._entries.items() if e.etag is not None},
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def make_key(tool_name: str, args: dict[str, Any]) -> tuple[str, str]:
+        return tool_name, json.dumps(args, sort_keys=True, separators=(",", ":"))
+
+    def get(self, key: tuple[str, str]) -> _CacheEntry | None:
+        return self._entries.get(key)
+
+    def put(
+        self,
+        key: tuple[str, str],
+        result: Any,
+        etag: str | None,
+        trace_id: str,
+        file_path: str | None = None,
+    ) -> None:
+        self._entries[key] = _CacheEntry(
+            result=copy.deepcopy(result),
+            etag=etag,
+            file_path=_normalize_path(file_path) if file_path else None,
+            validated_in=trace_id,
+        )
+
+    def invalidate_path(self, file_path: str) -> None:
+        """
+        Drops entries a write to file_path may have made stale.
+        Listings and grep results are always dropped since the write may
+        create a new file or match.
+        """
+        target = _normalize_path(file_path)
+        for key, entry in list(self._entries.items()):
+            if key[0] in TREE_WIDE_TOOLS or entry.file_path == target:
+                del self._entries[key]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+@functools.cache
+def get_tool_registry() -> dict[str, ToolSpec]:
     """
+    Compiles the tool registry once per process.
+    """
+    return build_registry((SCHEMAS_DIR / name, url) for name, url in TOOL_SOURCES)
+
+
+def _parse_hermes_json(output: str) -> Any:
     # Attempt to find JSON within fences
     try:
         start_idx = output.find("```json")
         end_idx = output.find("```", start_idx + 1)
         if start_idx != -1 and end_idx != -1:
             json_str = output[start_idx + len("```json") : end_idx].strip()
-            return json.loads(json_str)  # type: ignore[no-any-return]
+            return json.loads(json_str)
     except json.JSONDecodeError:
         pass  # Will retry
 
     # If not found in fences or decode failed, try to parse the whole output
     try:
-        return json.loads(output)  # type: ignore[no-any-return]
+        return json.loads(output)
     except json.JSONDecodeError as e:
         raise JsonExtractionError(f"Failed to extract valid JSON: {e}")
 
 
-async def execute_tool_call(tool_call: dict[str, Any], trace_id: str) -> Any:
+def extract_json_from_hermes_output(output: str) -> dict[str, Any]:
     """
-    Executes a single tool call against the MCP.
+    Extracts JSON from Hermes output, handling JSON fences and retrying once.
+    The result is validated against the plan schema when it has "tasks" and
+    against the Hermes response schema otherwise.
     """
-    headers = {"X-Trace-ID": trace_id}
+    document = _parse_hermes_json(output)
+    is_plan = isinstance(document, dict) and "tasks" in document
+    schema_name = PLAN_SCHEMA if is_plan else HERMES_RESPONSE_SCHEMA
+    try:
+        load_validator(schema_name)(document)
+    except SchemaValidationError as e:
+        raise JsonExtractionError(f"Output does not match {schema_name}: {e}")
+    return document  # type: ignore[no-any-return]
+
+
+def normalize_tool_call(tool_call: dict[str, Any]) -> dict[str, Any]:
+    """
+    Maps the {"name", "parameters"} form of the Hermes schema onto the
+    {"tool_name", "args"} form used by execute_tool_call.
+    """
+    if "tool_name" in tool_call:
+        return tool_call
+    return {"tool_name": tool_call.get("name"), "args": tool_call.get("parameters", {})}
+
+
+def _plan_levels(tasks: list[dict[str, Any]]) -> list[list[dict[str, Any]]]:
+    """
+    Groups tasks into levels whose dependencies all lie in earlier levels.
+    Raises PolicyError on duplicate ids, unknown dependencies or cycles.
+    """
+    by_id: dict[str, dict[str, Any]] = {}
+    for task in tasks:
+        if task["id"] in by_id:
+            raise PolicyError(f"Duplicate task id: {task['id']}")
+        by_id[task["id"]] = task
+
+    remaining = {task["id"]: set(task.get("depends_on", [])) for task in tasks}
+    for task_id, deps in remaining.items():
+        unknown = deps - by_id.keys()
+        if unknown:
+            raise PolicyError(f"Task {task_id} depends on unknown tasks: {unknown}")
+
+    levels = []
+    while remaining:
+        ready = [task_id for task_id, deps in remaining.items() if not deps]
+        if not ready:
+            raise PolicyError(f"Dependency cycle among tasks: {sorted(remaining)}")
+        levels.append([by_id[task_id] for task_id in ready])
+        for task_id in ready:
+            del remaining[task_id]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+    return levels
+
+
+def _tool_result(
+    task: dict[str, Any], data: Any = None, error: str | None = None
+) -> dict[str, Any]:
+    # Shaped after schemas/tool_result.schema.json
+    if error is not None:
+        return {
+            "tool": task["tool"],
+            "args": task["args"],
+            "result": {"ok": False, "error": error},
+        }
+    if not isinstance(data, dict):
+        data = {"value": data}
+    return {
+        "tool": task["tool"],
+        "args": task["args"],
+        "result": {"ok": True, "data": data},
+    }
+
+
+async def execute_plan(
+    plan: dict[str, Any], trace_id: str, cache: ToolResultCache | None = None
+) -> dict[str, dict[str, Any]]:
+    """
+    Executes a plan_v1 document, running independent tasks concurrently.
+
+    With on_error.policy "continue", failed tasks and tasks depending on them
+    are recorded as failed results and the rest of the plan still runs;
+    otherwise the first failure is raised. With "rollback" the MCP journals
+    every write of the run, and a failure first undoes them all before it is
+    raised; a successful run commits the journal. Returns tool results by
+    task id.
+    """
+    try:
+        load_validator(PLAN_SCHEMA)(plan)
+    except SchemaValidationError as e:
+        raise PolicyError(f"Invalid plan: {e}")
+    levels = _plan_levels(plan["tasks"])
+    policy = plan.get("on_error", {}).get("policy", "halt")
+    if policy != "rollback":
+        return await _execute_levels(levels, policy, trace_id, cache)
+
+    try:
+        results = await _execute_levels(levels, policy, trace_id, cache, journal=True)
+    except Exception as e:
+        with tracer.span("rollback", trace_id=trace_id):
+            try:
+                restored = await _finish_journal("rollback", trace_id)
+            except ExecutionError as rollback_error:
+                raise ExecutionError(
+                    f"{e}; rolling back the plan also failed: {rollback_error}"
+                ) from e
+        if cache is not None:
+            for file_path in restored:
+                cache.invalidate_path(file_path)
+        raise
+    with tracer.span("commit", trace_id=trace_id) as span:
+        try:
+            await _finish_journal("commit", trace_id)
+        except ExecutionError as e:
+            # The writes stand either way; the MCP expires the journal later
+            span.set_attribute("error", str(e))
+    return results
+
+
+async def _execute_levels(
+    levels: list[list[dict[str, Any]]],
+    policy: str,
+    trace_id: str,
+    cache: ToolResultCache | None,
+    journal: bool = False,
+) -> dict[str, dict[str, Any]]:
+    results: dict[str, dict[str, Any]] = {}
+    failed: set[str] = set()
+    for level in levels:
+        runnable = []
+        for task in level:
+            blocked = failed.intersection(task.get("depends_on", []))
+            if blocked:
+                failed.add(task["id"])
+                results[task["id"]] = _tool_result(
+                    task,
+                    error=f"Skipped: dependency failed ({', '.join(sorted(blocked))})",
+                )
+            else:
+                runnable.append(task)
+
+        outcomes = await asyncio.gather(
+            *(
+                execute_tool_call(
+                    {"tool_name": task["tool"], "args": task["args"]},
+                    trace_id,
+                    cache,
+                    journal=journal,
+                )
+                for task in runnable
+            ),
+            return_exceptions=True,
+        )
+        for task, outcome in zip(runnable, outcomes, strict=True):
+            if isinstance(outcome, BaseException):
+                if policy != "continue" or not isinstance(outcome, OrchestratorError):
+                    raise outcome
+                failed.add(task["id"])
+                results[task["id"]] = _tool_result(task, error=str(outcome))
+            else:
+                results[task["id"]] = _tool_result(task, data=outcome)
+    return results
+
+
+async def execute_tool_call(
+    tool_call: dict[str, Any],
+    trace_id: str,
+    cache: ToolResultCache | None = None,
+    journal: bool = False,
+) -> Any:
+    """
+    Executes a single tool call through the tool registry.
+    Args are validated against the tool's schema before any request is sent.
+    Read-only tool results are served from and stored in cache when given.
+    With journal, the MCP records how to undo the call's writes under trace_id.
+    """
+    tool_name = str(tool_call.get("tool_name"))
+    with tracer.span("tool_call", trace_id=trace_id, tool=tool_name) as span:
+        outcome = "error"
+        try:
+            result = await _execute_tool_call(tool_call, trace_id, cache, span, journal)
+            outcome = span.attributes.get("cache", "ok")
+            return result
+        finally:
+            tracer.metrics.inc(
+                "orchestrator_tool_calls_total", tool=tool_name, outcome=outcome
+            )
+
+
+async def _execute_tool_call(
+    tool_call: dict[str, Any],
+    trace_id: str,
+    cache: ToolResultCache | None,
+    span: Span,
+    journal: bool,
+) -> Any:
+    headers = {"X-Trace-ID": trace_id, "Accept": accept_header()}
+    if is_profiling():
+        headers["X-Profile"] = "1"
+    if journal:
+        headers["X-Journal"] = "1"
 
     tool_name = tool_call.get("tool_name")
     args = tool_call.get("args", {})  # Define here
 
+    cache_key = None
+    cached = None
+    if cache is not None and tool_name in READ_ONLY_TOOLS:
+        cache_key = cache.make_key(tool_name, args)
+        cached = cache.get(cache_key)
+        if cached is not None and cached.validated_in == trace_id:
+            span.set_attribute("cache", "hit")
+            return copy.deepcopy(cached.result)
+
+    spec = get_tool_registry().get(tool_name) if isinstance(tool_name, str) else None
+    if spec is None:
+        raise PolicyError(f"Unsupported tool: {tool_name}")
     try:
-        async with httpx.AsyncClient(base_url=MCP_BASE_URL) as client:  # Use async with
-            if tool_name == "list_files":
-                response = await client.get("/list_files", params=args, headers=headers)
-            elif tool_name == "read_file":
-                response = await client.get("/read_file", params=args, headers=headers)
-            elif tool_name == "write_file":
-                # For write_file, content is in the body
-                file_path = args.pop("file_path")
-                content = args.pop("content")
-                response = await client.post(
-                    f"/write_file?file_path={file_path}",
-                    json={"content": content},
-                    headers=headers,
+        request = spec.build_request(args)
+    except SchemaValidationError as e:
+        raise PolicyError(f"Invalid args for {tool_name}: {e}")
+
+    if cached is not None and cached.etag is not None:
+        headers["If-None-Match"] = cached.etag
+    if tool_name == "write_file" and cache is not None:
+        # Invalidate up front: a failed write may still have touched the file
+        cache.invalidate_path(args["file_path"])
+
+    request_kwargs: dict[str, Any] = {"params": request.params}
+    if request.body is not None:
+        request_kwargs["json"] = request.body
+
+    # Imported on first use: runs that never reach a tool call, and the CLI's
+    # --help, skip loading httpx and its dependencies
+    import httpx
+
+    service = service_health(spec.base_url)
+    try:
+        async with httpx.AsyncClient(base_url=spec.base_url) as client:
+            send = getattr(client, request.method)
+            response = await call_with_resilience(
+                lambda: send(request.path, **request_kwargs, headers=headers),
+                # Replaying an append would duplicate the appended content
+                idempotent=spec.idempotent and args.get("mode") != "append",
+                hedgeable=tool_name in READ_ONLY_TOOLS,
+                policy=RETRY_POLICY,
+                breaker=service.breaker,
+                latency=service.latency,
+            )
+
+            if cached is not None and response.status_code == 304:
+                cached.validated_in = trace_id
+                span.set_attribute("cache", "revalidated")
+                return copy.deepcopy(cached.result)
+
+            response.raise_for_status()
+            # Decoded from bytes: no intermediate str for large results
+            result = spec.decode(response.content, response.headers.get("Content-Type"))
+            if cache is not None and cache_key is not None:
+                cache.put(
+                    cache_key,
+                    result,
+                    response.headers.get("ETag"),
+                    trace_id,
+                    file_path=args.get("file_path"),
                 )
-                # write_file は Response を返すため、json() を呼び出さない
-                return {}  # 空の辞書を返すか、None を返すか、適切な値を返す
-            else:
-                raise PolicyError(f"Unsupported tool: {tool_name}")
+            return result
+    except httpx.HTTPStatusError as e:
+        raise ExecutionError(
+            f"{service.name} returned error: "
+            f"{e.response.status_code} - {e.response.text}"
+        )
+    except httpx.RequestError as e:
+        raise ExecutionError(f"Failed to connect to {service.name}: {e}")
+    except CircuitOpenError as e:
+        raise ExecutionError(f"{service.name} unavailable: {e}")
+
 
+async def _finish_journal(action: str, trace_id: str) -> list[str]:
+    """
+    Asks the MCP to roll back or commit the journaled writes of trace_id.
+    Returns the files the journal covered.
+    """
+    import httpx
+
+    service = service_health(MCP_BASE_URL)
+    try:
+        async with httpx.AsyncClient(base_url=MCP_BASE_URL) as client:
+            response = await call_with_resilience(
+                lambda: client.post(f"/{action}", headers={"X-Trace-ID": trace_id}),
+                # A repeated rollback or commit finds no journal and does nothing
+                idempotent=True,
+                policy=RETRY_POLICY,
+                breaker=service.breaker,
+                latency=service.latency,
+            )
             response.raise_for_status()
-            json_response = json.loads(response.text)  # 手動でJSONを解析
-            return json_response
+            return list(response.json()["files"])
     except httpx.HTTPStatusError as e:
         raise ExecutionError(
-            f"MCP returned error: {e.response.status_code} - {e.response.text}"
+            f"{service.name} returned error: "
+            f"{e.response.status_code} - {e.response.text}"
         )
     except httpx.RequestError as e:
-        raise ExecutionError(f"Failed to connect to MCP: {e}")
+        raise ExecutionError(f"Failed to connect to {service.name}: {e}")
+    except CircuitOpenError as e:
+        raise ExecutionError(f"{service.name} unavailable: {e}")
 
 
-async def orchestrate(hermes_output: str) -> int:
+async def orchestrate(
+    hermes_output: str, cache: ToolResultCache | None = None, profile: bool = False
+) -> int:
     """
     Orchestrates tool calls based on Hermes output.
+    Pass the same cache to successive runs to reuse read results across them.
+    Without one, the cache is loaded from and saved to ORCHESTRATOR_CACHE_DIR
+    when it is set, so CLI runs revalidate each other's results.
+    With profile (or when sampled via PROFILE_SAMPLE_RATE) the run is profiled
+    and the MCP is asked to profile its side of the trace too.
     Returns exit code: 0 for success, 1 for exec_fail, 2 for policy, 3 for json.
+    A plan that runs to the end under "continue" with a failed task is exec_fail.
     """
     trace_id = str(uuid.uuid4())
+    cache_file = None
+    if cache is None:
+        cache_file = cache_file_from_env()
+        cache = ToolResultCache.load(cache_file) if cache_file else ToolResultCache()
     try:
-        hermes_json = extract_json_from_hermes_output(hermes_output)
-        tool_calls = hermes_json.get("tool_calls", [])
+        with (
+            tracer.span("orchestrate", trace_id=trace_id),
+            maybe_profile(tracer, trace_id, force=profile),
+        ):
+            with tracer.span("extract_json"):
+                hermes_json = extract_json_from_hermes_output(hermes_output)
+            if "tasks" in hermes_json:
+                with tracer.span("execute_plan", tasks=len(hermes_json["tasks"])):
+                    results = await execute_plan(hermes_json, trace_id, cache)
+                # With "continue" failures come back as results, not exceptions
+                if any(not r["result"]["ok"] for r in results.values()):
+                    return 1
+                return 0
+
+            tool_calls = hermes_json.get("tool_calls", [])
 
-        for tool_call in tool_calls:
-            await execute_tool_call(tool_call, trace_id)
+            for tool_call in tool_calls:
+                await execute_tool_call(normalize_tool_call(tool_call), trace_id, cache)
 
         return 0  # Success
     except JsonExtractionError:
@@ -114,6 +595,14 @@ async def orchestrate(hermes_output: str) -> int:
         return 1
     except Exception:
         return 1  # Generic execution failure
+    finally:
+        if cache_file is not None:
+            try:
+                cache.save(cache_file)
+            except OSError:
+                # Like trace export, a lost cache never changes the exit code
+                tracer.metrics.inc("orchestrator_cache_save_errors_total")
+        tracer.flush()
 
 
 if __name__ == "__main__":
@@ -146,6 +635,4 @@ if __name__ == "__main__":
         exit_code = await orchestrate(hermes_sample_output)
         print(f"Orchestrator finished with exit code: {exit_code}")
 
-    import asyncio
-
     asyncio.run(main())
@@ -0,0 +1,196 @@
+import functools
+import math
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from pathlib import Path
+from types import FrameType
+
+from src.tracing import Tracer, current_span, otlp_trace_id
+
+MAX_STACK_DEPTH = 128
+MIN_INTERVAL_SECONDS = 0.001
+
+# Only one profile runs at a time per process, which bounds the total overhead
+_profile_slot = threading.Lock()
+_profiling: ContextVar[bool] = ContextVar("profiling", default=False)
+
+
+class SamplingProfiler:
+    """
+    Samples the stack of one thread from a background thread.
+
+    Whatever that thread runs is sampled. On an asyncio event loop this is
+    every task the loop runs meanwhile, not just the one that started the
+    profile, and work sent to other threads (asyncio.to_thread) is missed.
+    Stacks are aggregated in the collapsed format flamegraph.pl and speedscope
+    read. Time spent taking samples is measured, since the sampler holds the
+    GIL while it walks frames and so stalls the profiled thread for as long.
+    """
+
+    def __init__(
+        self,
+        thread_id: int | None = None,
+        interval: float = 0.01,
+        max_samples: int = 10_000,
+    ) -> None:
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = interval
+        self.max_samples = max_samples
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self.sampling_seconds = 0.0
+        self.wall_seconds = 0.0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._started_at = 0.0
+
+    @property
+    def overhead_ratio(self) -> float:
+        return self.sampling_seconds / self.wall_seconds if self.wall_seconds else 0.0
+
+    def start(self) -> None:
+        self._started_at = time.perf_counter()
+        self._thread = threading.Thread(
+            target=self._run, name="sampling-profiler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.wall_seconds = time.perf_counter() - self._started_at
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval) and self.samples < self.max_samples:
+            start = time.perf_counter()
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[_collapse(frame)] += 1
+                self.samples += 1
+            self.sampling_seconds += time.perf_counter() - start
+
+    def write_folded(self, path: Path) -> None:
+        """
+        Appends "frame;frame;... count" lines, so profiles of one trace add up.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            for stack, count in self.stacks.items():
+                f.write(f"{stack} {count}\n")
+
+
+def _collapse(frame: FrameType | None) -> str:
+    labels: list[str] = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        filename = os.path.basename(code.co_filename).replace(";", "_")
+        labels.append(f"{code.co_name} ({filename}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+def profile_dir(tracer: Tracer) -> Path:
+    """
+    PROFILE_DIR if set, else the trace file's directory, else ./profiles.
+    """
+    configured = os.environ.get("PROFILE_DIR")
+    if configured:
+        return Path(configured)
+    if tracer.trace_file:
+        return Path(tracer.trace_file).parent
+    return Path("profiles")
+
+
+@dataclass(frozen=True)
+class ProfileSettings:
+    sample_rate: float = 0.0
+    interval: float = 0.01
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        value = float(os.environ.get(name, default))
+    except ValueError:
+        return default
+    return value if math.isfinite(value) else default
+
+
+@functools.cache
+def profile_settings() -> ProfileSettings:
+    """
+    PROFILE_SAMPLE_RATE and PROFILE_INTERVAL_MS, read once per process.
+    Invalid values fall back to the defaults instead of failing every call.
+    """
+    sample_rate = min(max(_env_float("PROFILE_SAMPLE_RATE", 0.0), 0.0), 1.0)
+    interval = _env_float("PROFILE_INTERVAL_MS", 10.0) / 1000
+    return ProfileSettings(sample_rate, max(interval, MIN_INTERVAL_SECONDS))
+
+
+def is_profiling() -> bool:
+    """
+    Whether the current context runs under maybe_profile, e.g. to ask
+    downstream services to profile the same trace.
+    """
+    return _profiling.get()
+
+
+@contextmanager
+def maybe_profile(
+    tracer: Tracer, trace_id: str, force: bool = False
+) -> Iterator[SamplingProfiler | None]:
+    """
+    Profiles the enclosed block when forced or sampled by PROFILE_SAMPLE_RATE.
+
+    Yields None when not profiling, including when another profile is already
+    running. The profile covers the calling thread while the block is open,
+    so in the server it shows the whole event loop during the request rather
+    than that request alone. The folded output is appended to
+    <profile_dir>/<service>-<otlp trace id>.folded and the sample count and
+    overhead are recorded on the current span. A profile that cannot be
+    written is counted instead of raised, so it never fails the block.
+    """
+    settings = profile_settings()
+    selected = force or (
+        settings.sample_rate > 0 and random.random() < settings.sample_rate
+    )
+    if not selected or not _profile_slot.acquire(blocking=False):
+        yield None
+        return
+
+    profiler = SamplingProfiler(interval=settings.interval)
+    token = _profiling.set(True)
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        _profile_slot.release()
+        _profiling.reset(token)
+        # The hex form keeps caller-supplied trace ids out of the file path
+        file_name = f"{tracer.service_name}-{otlp_trace_id(trace_id)}.folded"
+        path = profile_dir(tracer) / file_name
+        span = current_span()
+        try:
+            profiler.write_folded(path)
+        except OSError:
+            tracer.metrics.inc(f"{tracer.service_name}_profile_export_errors_total")
+        else:
+            if span is not None:
+                span.set_attribute("profile.path", str(path))
+        if span is not None:
+            span.set_attribute("profile.samples", profiler.samples)
+            span.set_attribute("profile.overhead_ratio", profiler.overhead_ratio)
+        tracer.metrics.inc(f"{tracer.service_name}_profiles_total")
+        tracer.metrics.inc(
+            f"{tracer.service_name}_profile_overhead_seconds_total",
+            profiler.sampling_seconds,
+        )
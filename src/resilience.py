@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import httpx
+
+# Statuses that signal a transient server-side condition worth retrying
+RETRYABLE_STATUS_CODES = frozenset({429, 502, 503, 504})
+# Statuses that count against the circuit breaker, unless they are rejections
+UNHEALTHY_STATUS_CODES = frozenset({500, 502, 503, 504})
+
+
+def is_rejection(response: httpx.Response) -> bool:
+    """
+    Whether the server turned the request away before running it: a 429, or
+    a 503 with Retry-After as admission control sends when a queue is full.
+    Such a response is no sign of ill health and is safe to replay.
+    """
+    return response.status_code == 429 or (
+        response.status_code == 503 and retry_after_seconds(response) is not None
+    )
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the circuit breaker is open."""
+
+    pass
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    Retry and hedging settings for a single logical call.
+    Backoff uses full jitter: a uniform delay in [0, base_delay * 2**attempt].
+    A server's Retry-After is honored up to max_retry_after; a longer one
+    ends the retries, since the caller would rather fail than stall.
+    """
+
+    max_attempts: int = 3
+    base_delay: float = 0.05
+    max_delay: float = 1.0
+    max_retry_after: float = 5.0
+    hedge: bool = False
+    hedge_min_samples: int = 20
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+
+def retry_after_seconds(response: httpx.Response) -> float | None:
+    """
+    Parses Retry-After as delta-seconds or an HTTP-date; None when absent or invalid.
+    """
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (retry_at - datetime.now(UTC)).total_seconds())
+
+
+class LatencyTracker:
+    """
+    Keeps a sliding window of recent call latencies in seconds.
+    """
+
+    def __init__(self, window: int = 256) -> None:
+        self._samples: deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, fraction: float) -> float | None:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+
+class CircuitBreaker:
+    """
+    Fails calls fast after failure_threshold consecutive failures.
+    After reset_timeout one trial call is let through (half-open); its outcome
+    closes the circuit again or re-opens it for another reset_timeout.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 10.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.reset()
+
+    def reset(self) -> None:
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def before_call(self) -> bool:
+        """
+        Raises CircuitOpenError unless a call may go through.
+        Returns whether this call is the half-open trial.
+        """
+        state = self.state
+        if state == "open" or (state == "half_open" and self._trial_in_flight):
+            raise CircuitOpenError(
+                f"Circuit open after {self.failures} consecutive failures"
+            )
+        if state == "half_open":
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def release_trial(self) -> None:
+        """
+        Lets another call be the trial when this one ended without an outcome,
+        e.g. it was cancelled or failed before reaching the server.
+        """
+        self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        self.reset()
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+async def _timed(
+    send: Callable[[], Awaitable[httpx.Response]], latency: LatencyTracker
+) -> httpx.Response:
+    start = time.perf_counter()
+    response = await send()
+    latency.record(time.perf_counter() - start)
+    return response
+
+
+async def _hedged(
+    send: Callable[[], Awaitable[httpx.Response]],
+    latency: LatencyTracker,
+    delay: float,
+) -> httpx.Response:
+    """
+    Sends a duplicate request if the first has not answered within delay
+    and returns whichever succeeds first.
+    """
+    first = asyncio.ensure_future(_timed(send, latency))
+    done, _ = await asyncio.wait({first}, timeout=delay)
+    if done:
+        return first.result()
+
+    pending = {first, asyncio.ensure_future(_timed(send, latency))}
+    error: BaseException | None = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        assert error is not None
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def call_with_resilience(
+    send: Callable[[], Awaitable[httpx.Response]],
+    *,
+    idempotent: bool,
+    hedgeable: bool = False,
+    policy: RetryPolicy,
+    breaker: CircuitBreaker,
+    latency: LatencyTracker,
+) -> httpx.Response:
+    """
+    Sends a request with retries, optional hedging and circuit breaking.
+
+    Idempotent calls are retried on any transport error or retryable status.
+    Only hedgeable calls (reads) may be hedged, once the p95 latency is known:
+    a losing duplicate can still run on the server after the caller moved on,
+    which a write must never do. Other calls are retried
+    only when the request provably never reached the server or was rejected
+    before it ran (see is_rejection). A retryable
+    response's Retry-After replaces the backoff delay. The last response is
+    returned when retries run out; the last error is re-raised.
+    """
+    # Imported here, so that importing this module does not load httpx
+    import httpx
+
+    # Errors raised before the request reached the server; replay is always safe
+    not_sent_errors = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+    for attempt in range(policy.max_attempts):
+        delay = policy.backoff(attempt)
+        last_attempt = attempt == policy.max_attempts - 1
+        trial = breaker.before_call()
+        try:
+            hedge_delay = None
+            if hedgeable and policy.hedge and len(latency) >= policy.hedge_min_samples:
+                hedge_delay = latency.percentile(0.95)
+            if hedge_delay is not None:
+                response = await _hedged(send, latency, hedge_delay)
+            else:
+                response = await _timed(send, latency)
+        except httpx.RequestError as e:
+            breaker.record_failure()
+            if last_attempt or not (idempotent or isinstance(e, not_sent_errors)):
+                raise
+        except BaseException:
+            # Neither success nor failure, but the trial slot must not stay taken
+            if trial:
+                breaker.release_trial()
+            raise
+        else:
+            rejected = is_rejection(response)
+            if response.status_code in UNHEALTHY_STATUS_CODES and not rejected:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            retryable = response.status_code in RETRYABLE_STATUS_CODES and (
+                idempotent or rejected
+            )
+            if last_attempt or not retryable:
+                return response
+            retry_after = retry_after_seconds(response)
+            if retry_after is not None:
+                if retry_after > policy.max_retry_after:
+                    return response
+                delay = retry_after
+        await asyncio.sleep(delay)
+    raise AssertionError("unreachable")  # pragma: no cover
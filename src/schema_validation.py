@@ -0,0 +1,285 @@
+import functools
+import json
+import re
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+SCHEMAS_DIR = Path(__file__).parent.parent / "schemas"
+
+Validator = Callable[[Any], None]
+_Check = Callable[[Any], None]
+
+_TYPE_CHECKS: dict[str, Callable[[Any], bool]] = {
+    "object": lambda v: isinstance(v, dict),
+    "array": lambda v: isinstance(v, list),
+    "string": lambda v: isinstance(v, str),
+    "boolean": lambda v: isinstance(v, bool),
+    "integer": lambda v: isinstance(v, int) and not isinstance(v, bool),
+    "number": lambda v: isinstance(v, int | float) and not isinstance(v, bool),
+    "null": lambda v: v is None,
+}
+
+
+class SchemaValidationError(ValueError):
+    """Raised when a document does not match its schema."""
+
+    def __init__(self, message: str, path: tuple[Any, ...] = ()):
+        super().__init__(message)
+        self.message = message
+        self.path = path
+
+    def __str__(self) -> str:
+        location = "/".join(str(p) for p in self.path) or "<root>"
+        return f"{location}: {self.message}"
+
+
+def _at(key: Any, check: _Check, v: Any) -> None:
+    # The path is only built while an error propagates, keeping valid documents cheap
+    try:
+        check(v)
+    except SchemaValidationError as e:
+        e.path = (key, *e.path)
+        raise
+
+
+def compile_schema(
+    schema: dict[str, Any], root: dict[str, Any] | None = None
+) -> Validator:
+    """
+    Compiles a JSON Schema into a validator that raises SchemaValidationError.
+
+    Supports the subset used by this project's schemas and OpenAPI documents:
+    type (incl. OpenAPI nullable), enum, const, required, properties,
+    additionalProperties, items, min/maxItems, uniqueItems, minimum, maximum,
+    min/maxLength, pattern, allOf/anyOf/oneOf and local $ref. Keywords are
+    resolved once here, so validating a document is only closure calls.
+    """
+    return _compile(schema, root if root is not None else schema, {})
+
+
+@functools.cache
+def load_validator(schema_name: str) -> Validator:
+    """
+    Returns the compiled validator for a schema file in SCHEMAS_DIR.
+    Each schema is read and compiled once per process.
+    """
+    with open(SCHEMAS_DIR / schema_name, encoding="utf-8") as f:
+        return compile_schema(json.load(f))
+
+
+def _resolve_ref(ref: str, root: dict[str, Any]) -> dict[str, Any]:
+    if not ref.startswith("#"):
+        raise ValueError(f"Only local $ref is supported: {ref}")
+    node: Any = root
+    for part in ref.lstrip("#").strip("/").split("/"):
+        if part:
+            node = node[part.replace("~1", "/").replace("~0", "~")]
+    return node  # type: ignore[no-any-return]
+
+
+def _compile(
+    schema: dict[str, Any], root: dict[str, Any], refs: dict[str, _Check]
+) -> _Check:
+    checks: list[_Check] = []
+
+    if "$ref" in schema:
+        ref = schema["$ref"]
+        if ref not in refs:
+            # Placeholder first so recursive schemas terminate
+            refs[ref] = lambda v: None
+            refs[ref] = _compile(_resolve_ref(ref, root), root, refs)
+        checks.append(lambda v: refs[ref](v))
+
+    if "type" in schema:
+        types = schema["type"] if isinstance(schema["type"], list) else [schema["type"]]
+        if schema.get("nullable"):
+            types = [*types, "null"]
+        type_checks = [_TYPE_CHECKS[t] for t in types]
+        expected = " or ".join(types)
+
+        def check_type(v: Any) -> None:
+            if not any(tc(v) for tc in type_checks):
+                raise SchemaValidationError(
+                    f"expected {expected}, got {type(v).__name__}"
+                )
+
+        checks.append(check_type)
+
+    if "enum" in schema:
+        allowed = schema["enum"]
+
+        def check_enum(v: Any) -> None:
+            if v not in allowed:
+                raise SchemaValidationError(f"{v!r} is not one of {allowed!r}")
+
+        checks.append(check_enum)
+
+    if "const" in schema:
+        const = schema["const"]
+
+        def check_const(v: Any) -> None:
+            if v != const:
+                raise SchemaValidationError(f"expected {const!r}, got {v!r}")
+
+        checks.append(check_const)
+
+    checks.extend(_compile_object(schema, root, refs))
+    checks.extend(_compile_array(schema, root, refs))
+    checks.extend(_compile_scalar(schema))
+
+    for keyword in ("allOf", "anyOf", "oneOf"):
+        if keyword in schema:
+            checks.append(_compile_combinator(keyword, schema[keyword], root, refs))
+
+    if len(checks) == 1:
+        return checks[0]
+
+    def check_all(v: Any) -> None:
+        for c in checks:
+            c(v)
+
+    return check_all
+
+
+def _compile_object(
+    schema: dict[str, Any], root: dict[str, Any], refs: dict[str, _Check]
+) -> list[_Check]:
+    checks: list[_Check] = []
+    required = schema.get("required", [])
+    properties = {
+        name: _compile(sub, root, refs)
+        for name, sub in schema.get("properties", {}).items()
+    }
+    additional = schema.get("additionalProperties", True)
+    additional_check = (
+        _compile(additional, root, refs) if isinstance(additional, dict) else None
+    )
+
+    if not (required or properties or additional is not True):
+        return checks
+
+    def check_object(v: Any) -> None:
+        if not isinstance(v, dict):
+            return
+        for name in required:
+            if name not in v:
+                raise SchemaValidationError(f"missing required property {name!r}")
+        for name, value in v.items():
+            prop_check = properties.get(name)
+            if prop_check is not None:
+                _at(name, prop_check, value)
+            elif additional is False:
+                raise SchemaValidationError(f"unexpected property {name!r}")
+            elif additional_check is not None:
+                _at(name, additional_check, value)
+
+    checks.append(check_object)
+    return checks
+
+
+def _compile_array(
+    schema: dict[str, Any], root: dict[str, Any], refs: dict[str, _Check]
+) -> list[_Check]:
+    checks: list[_Check] = []
+    if "items" in schema:
+        item_check = _compile(schema["items"], root, refs)
+
+        def check_items(v: Any) -> None:
+            if isinstance(v, list):
+                for i, item in enumerate(v):
+                    _at(i, item_check, item)
+
+        checks.append(check_items)
+
+    min_items = schema.get("minItems")
+    max_items = schema.get("maxItems")
+    unique = schema.get("uniqueItems", False)
+    if min_items is not None or max_items is not None or unique:
+
+        def check_array(v: Any) -> None:
+            if not isinstance(v, list):
+                return
+            if min_items is not None and len(v) < min_items:
+                raise SchemaValidationError(f"expected at least {min_items} items")
+            if max_items is not None and len(v) > max_items:
+                raise SchemaValidationError(f"expected at most {max_items} items")
+            if unique and len({repr(item) for item in v}) != len(v):
+                raise SchemaValidationError("items are not unique")
+
+        checks.append(check_array)
+    return checks
+
+
+def _compile_scalar(schema: dict[str, Any]) -> list[_Check]:
+    checks: list[_Check] = []
+    minimum = schema.get("minimum")
+    maximum = schema.get("maximum")
+    if minimum is not None or maximum is not None:
+
+        def check_range(v: Any) -> None:
+            if not _TYPE_CHECKS["number"](v):
+                return
+            if minimum is not None and v < minimum:
+                raise SchemaValidationError(f"{v} is less than {minimum}")
+            if maximum is not None and v > maximum:
+                raise SchemaValidationError(f"{v} is greater than {maximum}")
+
+        checks.append(check_range)
+
+    min_length = schema.get("minLength")
+    max_length = schema.get("maxLength")
+    pattern = re.compile(schema["pattern"]) if "pattern" in schema else None
+    if min_length is not None or max_length is not None or pattern is not None:
+
+        def check_string(v: Any) -> None:
+            if not isinstance(v, str):
+                return
+            if min_length is not None and len(v) < min_length:
+                raise SchemaValidationError(f"shorter than {min_length} characters")
+            if max_length is not None and len(v) > max_length:
+                raise SchemaValidationError(f"longer than {max_length} characters")
+            if pattern is not None and not pattern.search(v):
+                raise SchemaValidationError(f"{v!r} does not match {pattern.pattern!r}")
+
+        checks.append(check_string)
+    return checks
+
+
+def _compile_combinator(
+    keyword: str,
+    subschemas: list[dict[str, Any]],
+    root: dict[str, Any],
+    refs: dict[str, _Check],
+) -> _Check:
+    sub_checks = [_compile(sub, root, refs) for sub in subschemas]
+
+    if keyword == "allOf":
+
+        def check_all_of(v: Any) -> None:
+            for c in sub_checks:
+                c(v)
+
+        return check_all_of
+
+    def check_some_of(v: Any) -> None:
+        errors: list[SchemaValidationError] = []
+        passed = 0
+        for c in sub_checks:
+            try:
+                c(v)
+            except SchemaValidationError as e:
+                errors.append(e)
+                continue
+            passed += 1
+            if keyword == "anyOf":
+                return
+        if passed == 0:
+            details = "; ".join(str(e) for e in errors)
+            raise SchemaValidationError(
+                f"does not match any {keyword} schema ({details})"
+            )
+        if passed > 1:
+            raise SchemaValidationError("matches more than one oneOf schema")
+
+    return check_some_of
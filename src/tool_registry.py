@@ -0,0 +1,167 @@
+from collections.abc import Iterable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+from urllib.parse import quote
+
+from src.schema_validation import SchemaValidationError, Validator, compile_schema
+from src.wire import decode
+
+HTTP_METHODS = ("get", "put", "post", "delete", "patch")
+IDEMPOTENT_METHODS = frozenset({"get", "put", "delete"})
+
+
+@dataclass(frozen=True)
+class ToolRequest:
+    method: str
+    path: str
+    params: dict[str, Any]
+    body: dict[str, Any] | None
+
+
+@dataclass(frozen=True)
+class ToolSpec:
+    """
+    A tool compiled from one OpenAPI operation.
+
+    Query and path parameters become args sent in the URL; every other arg
+    goes into the JSON body. Args are validated before any request is built.
+    """
+
+    name: str
+    method: str
+    path: str
+    base_url: str
+    idempotent: bool
+    query_params: frozenset[str]
+    path_params: frozenset[str]
+    has_body: bool
+    returns_json: bool
+    validate: Validator
+
+    def build_request(self, args: dict[str, Any]) -> ToolRequest:
+        """
+        Validates args and splits them into URL and body parts.
+        Raises SchemaValidationError; args is never mutated.
+        """
+        self.validate(args)
+        path = self.path
+        for name in self.path_params:
+            path = path.replace(f"{{{name}}}", quote(str(args[name]), safe=""))
+        params = {k: v for k, v in args.items() if k in self.query_params}
+        body = None
+        if self.has_body:
+            body = {
+                k: v
+                for k, v in args.items()
+                if k not in self.query_params and k not in self.path_params
+            }
+        return ToolRequest(self.method, path, params, body)
+
+    def decode(self, content: bytes, content_type: str | None = None) -> Any:
+        return decode(content, content_type) if self.returns_json else {}
+
+
+def load_openapi(path: Path) -> dict[str, Any]:
+    # Imported here: only building the registry needs a YAML parser
+    import yaml
+
+    # libyaml's loader, when PyYAML was built with it, parses ~8x faster
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    with open(path, encoding="utf-8") as f:
+        return yaml.load(f, Loader=loader)  # type: ignore[no-any-return]
+
+
+def _compile_args_validator(
+    parameters: list[dict[str, Any]],
+    body_schema: dict[str, Any] | None,
+    document: dict[str, Any],
+) -> Validator:
+    param_names = {p["name"] for p in parameters}
+    validate_params = compile_schema(
+        {
+            "type": "object",
+            "properties": {p["name"]: p.get("schema", {}) for p in parameters},
+            "required": [p["name"] for p in parameters if p.get("required")],
+        },
+        root=document,
+    )
+    validate_body = (
+        compile_schema(body_schema, root=document) if body_schema is not None else None
+    )
+
+    def validate(args: Any) -> None:
+        if not isinstance(args, dict):
+            raise SchemaValidationError("args must be an object")
+        validate_params({k: v for k, v in args.items() if k in param_names})
+        rest = {k: v for k, v in args.items() if k not in param_names}
+        if validate_body is not None:
+            validate_body(rest)
+        elif rest:
+            raise SchemaValidationError(f"unexpected property {next(iter(rest))!r}")
+
+    return validate
+
+
+def _returns_json(operation: dict[str, Any]) -> bool:
+    for code, response in operation.get("responses", {}).items():
+        if str(code).startswith("2"):
+            return "application/json" in response.get("content", {})
+    return False
+
+
+def compile_tools(document: dict[str, Any], base_url: str) -> dict[str, ToolSpec]:
+    """
+    Compiles every operation of an OpenAPI document into a ToolSpec.
+    Tools are named by operationId, falling back to the last path segment.
+    """
+    tools: dict[str, ToolSpec] = {}
+    for path, path_item in document.get("paths", {}).items():
+        for method in HTTP_METHODS:
+            operation = path_item.get(method)
+            if operation is None:
+                continue
+            name = operation.get("operationId") or path.rstrip("/").rsplit("/", 1)[-1]
+            parameters = [
+                p
+                for p in path_item.get("parameters", [])
+                + operation.get("parameters", [])
+                if p.get("in") in ("query", "path")
+            ]
+            body_schema = (
+                operation.get("requestBody", {})
+                .get("content", {})
+                .get("application/json", {})
+                .get("schema")
+            )
+            tools[name] = ToolSpec(
+                name=name,
+                method=method,
+                path=path,
+                base_url=base_url,
+                idempotent=method in IDEMPOTENT_METHODS
+                or bool(operation.get("x-idempotent")),
+                query_params=frozenset(
+                    p["name"] for p in parameters if p["in"] == "query"
+                ),
+                path_params=frozenset(
+                    p["name"] for p in parameters if p["in"] == "path"
+                ),
+                has_body=body_schema is not None,
+                returns_json=_returns_json(operation),
+                validate=_compile_args_validator(parameters, body_schema, document),
+            )
+    return tools
+
+
+def build_registry(sources: Iterable[tuple[Path, str]]) -> dict[str, ToolSpec]:
+    """
+    Builds the tool registry from (OpenAPI document path, base URL) pairs.
+    """
+    registry: dict[str, ToolSpec] = {}
+    for path, base_url in sources:
+        for name, spec in compile_tools(load_openapi(path), base_url).items():
+            if name in registry:
+                raise ValueError(f"Duplicate tool name {name!r} in {path}")
+            registry[name] = spec
+    return registry
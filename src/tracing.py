@@ -0,0 +1,304 @@
+import bisect
+import hashlib
+import json
+import os
+import re
+import secrets
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any
+
+# Upper bounds in seconds, from sub-millisecond disk hits to slow network calls
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+_HEX_TRACE_ID = re.compile(r"^[0-9a-f]{32}$")
+
+_current_span: ContextVar["Span | None"] = ContextVar("current_span", default=None)
+
+
+def current_span() -> "Span | None":
+    return _current_span.get()
+
+
+def otlp_trace_id(trace_id: str) -> str:
+    """
+    Maps a trace_id to the 32 hex digit form OTLP requires.
+    UUIDs keep their digits; any other string is hashed.
+    """
+    compact = trace_id.replace("-", "").lower()
+    if _HEX_TRACE_ID.match(compact):
+        return compact
+    return hashlib.blake2b(trace_id.encode("utf-8"), digest_size=16).hexdigest()
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_span_id: str | None
+    start_ns: int
+    end_ns: int | None = None
+    attributes: dict[str, Any] = field(default_factory=dict)
+    error: str | None = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    @property
+    def duration_seconds(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e9
+
+    def to_otlp(self) -> dict[str, Any]:
+        span: dict[str, Any] = {
+            "traceId": otlp_trace_id(self.trace_id),
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [
+                {"key": "trace_id", "value": {"stringValue": self.trace_id}},
+                *(
+                    {"key": key, "value": _otlp_value(value)}
+                    for key, value in self.attributes.items()
+                ),
+            ],
+            "status": {"code": 2, "message": self.error}
+            if self.error is not None
+            else {"code": 1},
+        }
+        if self.parent_span_id is not None:
+            span["parentSpanId"] = self.parent_span_id
+        return span
+
+
+def _otlp_value(value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: tuple[tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape_label(v)}"' for k, v in labels) + "}"
+
+
+class _Histogram:
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """
+    In-process counters and histograms rendered in the Prometheus text format.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters: dict[str, dict[tuple[tuple[str, str], ...], float]] = {}
+        self._histograms: dict[str, dict[tuple[tuple[str, str], ...], _Histogram]] = {}
+
+    def inc(self, name: str, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + amount
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(self.buckets)
+            histogram.observe(value)
+
+    def counter_value(self, name: str, **labels: str) -> float:
+        return self._counters.get(name, {}).get(tuple(sorted(labels.items())), 0.0)
+
+    def histogram_count(self, name: str, **labels: str) -> int:
+        histogram = self._histograms.get(name, {}).get(tuple(sorted(labels.items())))
+        return histogram.count if histogram is not None else 0
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render_prometheus(self) -> str:
+        lines: list[str] = []
+        with self._lock:
+            for name, counter_series in sorted(self._counters.items()):
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in sorted(counter_series.items()):
+                    lines.append(f"{name}{_format_labels(labels)} {value:g}")
+            for name, histogram_series in sorted(self._histograms.items()):
+                lines.append(f"# TYPE {name} histogram")
+                for labels, histogram in sorted(histogram_series.items()):
+                    cumulative = 0
+                    bounds = [*(f"{b:g}" for b in histogram.buckets), "+Inf"]
+                    for bound, count in zip(bounds, histogram.counts, strict=True):
+                        cumulative += count
+                        bucket_labels = _format_labels((*labels, ("le", bound)))
+                        lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+                    lines.append(
+                        f"{name}_sum{_format_labels(labels)} {histogram.sum:g}"
+                    )
+                    lines.append(
+                        f"{name}_count{_format_labels(labels)} {histogram.count}"
+                    )
+        return "\n".join(lines) + "\n"
+
+
+class Tracer:
+    """
+    Records spans for one process and feeds their durations into metrics.
+
+    Spans nest through a context variable, so spans opened inside a span (or
+    in asyncio tasks created inside it) become its children. Finished spans
+    are buffered only when a trace file is configured and are appended to it
+    as OTLP/JSON lines by flush().
+    """
+
+    def __init__(
+        self,
+        metrics: MetricsRegistry,
+        service_name: str,
+        trace_file: str | None = None,
+        max_buffered_spans: int = 10_000,
+    ) -> None:
+        self.metrics = metrics
+        self.service_name = service_name
+        self.trace_file = trace_file
+        self.max_buffered_spans = max_buffered_spans
+        self._finished: list[Span] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(
+        self, name: str, trace_id: str | None = None, **attributes: Any
+    ) -> Iterator[Span]:
+        parent = _current_span.get()
+        if trace_id is None:
+            trace_id = parent.trace_id if parent is not None else secrets.token_hex(16)
+        span = Span(
+            name=name,
+            trace_id=trace_id,
+            span_id=secrets.token_hex(8),
+            parent_span_id=parent.span_id
+            if parent is not None and parent.trace_id == trace_id
+            else None,
+            start_ns=time.time_ns(),
+            attributes=attributes,
+        )
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end_ns = time.time_ns()
+            self._finish(span)
+
+    def _finish(self, span: Span) -> None:
+        self.metrics.observe(
+            f"{self.service_name}_span_duration_seconds",
+            span.duration_seconds,
+            span=span.name,
+        )
+        if self.trace_file is None:
+            return
+        with self._lock:
+            if len(self._finished) < self.max_buffered_spans:
+                self._finished.append(span)
+
+    def current_trace_id(self) -> str | None:
+        span = _current_span.get()
+        return span.trace_id if span is not None else None
+
+    def flush(self) -> None:
+        """
+        Appends buffered spans to the trace file as one OTLP/JSON request line.
+        A failed write drops the spans and is counted instead of raised, so
+        exporting traces never changes a response or an exit code.
+        """
+        with self._lock:
+            spans, self._finished = self._finished, []
+        if not spans or self.trace_file is None:
+            return
+        request = {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            {
+                                "key": "service.name",
+                                "value": {"stringValue": self.service_name},
+                            }
+                        ]
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": __name__},
+                            "spans": [span.to_otlp() for span in spans],
+                        }
+                    ],
+                }
+            ]
+        }
+        try:
+            with open(self.trace_file, "a", encoding="utf-8") as f:
+                f.write(json.dumps(request, separators=(",", ":")) + "\n")
+        except OSError:
+            self.metrics.inc(f"{self.service_name}_trace_export_errors_total")
+            self.metrics.inc(
+                f"{self.service_name}_trace_spans_dropped_total", len(spans)
+            )
+
+
+def create_tracer(service_name: str) -> Tracer:
+    """
+    Creates a tracer with its own metrics registry.
+    Set TRACE_FILE to also export spans as OTLP/JSON lines; empty means unset.
+    """
+    return Tracer(MetricsRegistry(), service_name, os.environ.get("TRACE_FILE") or None)
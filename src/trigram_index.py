@@ -0,0 +1,377 @@
+import os
+import pickle
+import re
+import threading
+import time
+from array import array
+from bisect import bisect_right
+from collections.abc import Collection
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+try:
+    from re import _parser as sre_parse  # type: ignore[attr-defined]
+except ImportError:  # pragma: no cover - private module; a full scan still works
+    sre_parse = None
+
+INDEX_FORMAT_VERSION = 1
+# Candidates left after which intersecting more postings costs more than reading
+CANDIDATES_WORTH_READING = 16
+MAX_MATCH_TEXT_CHARS = 300
+RESCAN_INTERVAL_SECONDS = 5.0
+# The whole index is rewritten on save, so rescans save at most this often.
+# Changes lost in between are only re-read: files are matched by mtime and size.
+SAVE_INTERVAL_SECONDS = 60.0
+
+
+@dataclass
+class _Doc:
+    doc_id: int
+    mtime_ns: int
+    size: int
+
+
+@dataclass(frozen=True)
+class GrepMatch:
+    path: str
+    span: str  # "L<first>-L<last>", 1-based and inclusive
+    text: str
+
+
+def trigrams(text: str) -> set[str]:
+    lowered = text.lower()
+    return {lowered[i : i + 3] for i in range(len(lowered) - 2)}
+
+
+def required_literals(pattern: str, regex: bool) -> list[str]:
+    """
+    Substrings every match of pattern must contain, used to pick candidates.
+    An empty list means the pattern cannot be narrowed and all files are read.
+    """
+    if not regex:
+        return [pattern] if len(pattern) >= 3 else []
+    if sre_parse is None:
+        return []
+    try:
+        parsed = sre_parse.parse(pattern)
+    except re.error:
+        return []
+    literals: list[str] = []
+    run: list[str] = []
+    # Only top-level literals are required: anything inside a group, class,
+    # repeat or alternation may be skipped by some match
+    for op, value in parsed:
+        if op is sre_parse.LITERAL:
+            run.append(chr(value))
+            continue
+        if op is sre_parse.BRANCH:
+            return []
+        literals.append("".join(run))
+        run = []
+    literals.append("".join(run))
+    return [literal for literal in literals if len(literal) >= 3]
+
+
+def _span_lines(line_starts: list[int], start: int, end: int) -> tuple[int, int]:
+    first = bisect_right(line_starts, start)
+    last = bisect_right(line_starts, max(start, end - 1))
+    return first, last
+
+
+class TrigramIndex:
+    """
+    Trigram index over the text files under root, for grep.
+
+    Each file gets a doc id and is listed in the postings of every
+    (lower-cased) trigram it contains. A search intersects the postings of
+    the trigrams its pattern requires and reads only the remaining files.
+    Re-indexed files get a new doc id; stale ids are filtered out at query
+    time and dropped when more than half of the ids are stale.
+
+    The index is persisted to index_file, so a restart only re-reads files
+    whose mtime or size changed.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        index_file: Path | None,
+        extensions: Collection[str],
+        max_file_size: int,
+    ) -> None:
+        self.root = root
+        self._real_root = root.resolve()
+        self.index_file = index_file
+        self.extensions = extensions
+        self.max_file_size = max_file_size
+        self.last_scan: float | None = None
+        self._docs: dict[str, _Doc] = {}
+        self._paths: list[str | None] = []  # doc id -> path, None once stale
+        self._postings: dict[str, array[int]] = {}
+        self._dirty = False
+        self._last_save: float | None = None
+        self._lock = threading.Lock()
+        self._scan_lock = threading.Lock()
+        # Set once the index covers the whole tree, by a full scan or a load
+        self._ready = threading.Event()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def _indexable(self, rel_path: str) -> bool:
+        return os.path.splitext(rel_path)[1] in self.extensions
+
+    def _read(self, rel_path: str) -> str | None:
+        """
+        Returns the file's text, or None when it is unreadable, not UTF-8, or
+        resolves outside root (e.g. a symlink), as validate_path would refuse.
+        """
+        try:
+            abs_path = (self.root / rel_path).resolve()
+            if not abs_path.is_relative_to(self._real_root):
+                return None
+            with open(abs_path, encoding="utf-8") as f:
+                return f.read()
+        except (OSError, UnicodeDecodeError):
+            return None
+
+    def _add(self, rel_path: str, stat: os.stat_result, text: str) -> None:
+        self._remove(rel_path)
+        doc_id = len(self._paths)
+        self._paths.append(rel_path)
+        self._docs[rel_path] = _Doc(doc_id, stat.st_mtime_ns, stat.st_size)
+        for trigram in trigrams(text):
+            postings = self._postings.get(trigram)
+            if postings is None:
+                postings = self._postings[trigram] = array("I")
+            postings.append(doc_id)  # Ids only grow, so postings stay sorted
+        self._dirty = True
+
+    def _remove(self, rel_path: str) -> None:
+        doc = self._docs.pop(rel_path, None)
+        if doc is not None:
+            self._paths[doc.doc_id] = None
+            self._dirty = True
+
+    def update_file(self, rel_path: str) -> None:
+        """
+        Re-indexes one file after it was written, or drops it if it is gone.
+        """
+        if not self._indexable(rel_path):
+            return
+        try:
+            stat = (self.root / rel_path).stat()
+        except FileNotFoundError:
+            with self._lock:
+                self._remove(rel_path)
+            return
+        text = self._read(rel_path) if stat.st_size <= self.max_file_size else None
+        with self._lock:
+            if text is None:
+                self._remove(rel_path)
+            else:
+                self._add(rel_path, stat, text)
+
+    def refresh(self) -> int:
+        """
+        Walks root and re-indexes new or changed files, dropping deleted ones.
+        The first refresh starts from the saved index, if any; changes are
+        saved at most every SAVE_INTERVAL_SECONDS. Returns the number of changes.
+        """
+        with self._scan_lock:
+            if self.last_scan is None and not self._ready.is_set():
+                self.load()  # Searches can start before the walk finishes
+            seen: set[str] = set()
+            changes = 0
+            for dirpath, _, files in os.walk(self.root):
+                for name in files:
+                    abs_path = os.path.join(dirpath, name)
+                    rel_path = os.path.relpath(abs_path, self.root)
+                    if not self._indexable(rel_path):
+                        continue
+                    try:
+                        stat = os.stat(abs_path)
+                    except FileNotFoundError:
+                        continue
+                    seen.add(rel_path)
+                    doc = self._docs.get(rel_path)
+                    if doc is not None and (doc.mtime_ns, doc.size) == (
+                        stat.st_mtime_ns,
+                        stat.st_size,
+                    ):
+                        continue
+                    changes += 1
+                    text = None
+                    if stat.st_size <= self.max_file_size:
+                        text = self._read(rel_path)
+                    with self._lock:
+                        if text is None:
+                            self._remove(rel_path)
+                        else:
+                            self._add(rel_path, stat, text)
+            with self._lock:
+                for rel_path in set(self._docs) - seen:
+                    # Skip files written through update_file after the walk passed
+                    if not (self.root / rel_path).exists():
+                        self._remove(rel_path)
+                        changes += 1
+                if len(self._paths) > 2 * len(self._docs) + 1024:
+                    self._compact()
+            self.last_scan = time.monotonic()
+            self._ready.set()
+            if self._dirty and (
+                self._last_save is None
+                or self.last_scan - self._last_save >= SAVE_INTERVAL_SECONDS
+            ):
+                self.save()
+            return changes
+
+    def refresh_in_background(self) -> None:
+        """
+        Starts a refresh on a daemon thread unless one is already running.
+        """
+        if self._scan_lock.locked():
+            return
+        threading.Thread(
+            target=self.refresh, name="trigram-rescan", daemon=True
+        ).start()
+
+    def wait_ready(self, timeout: float | None = None) -> bool:
+        """
+        Waits until the first full scan or load is done; returns whether it is.
+        Until then a search would only see the files scanned so far.
+        """
+        return self._ready.wait(timeout)
+
+    def needs_refresh(self) -> bool:
+        return (
+            self.last_scan is None
+            or time.monotonic() - self.last_scan > RESCAN_INTERVAL_SECONDS
+        )
+
+    def _compact(self) -> None:
+        remap: dict[int, int] = {}
+        paths: list[str | None] = []
+        for rel_path, doc in sorted(self._docs.items(), key=lambda d: d[1].doc_id):
+            remap[doc.doc_id] = len(paths)
+            doc.doc_id = len(paths)
+            paths.append(rel_path)
+        postings = {}
+        for trigram, ids in self._postings.items():
+            live = array("I", (remap[i] for i in ids if i in remap))
+            if live:
+                postings[trigram] = live
+        self._paths = paths
+        self._postings = postings
+        self._dirty = True
+
+    def save(self) -> None:
+        if self.index_file is None:
+            return
+        with self._lock:
+            state = {
+                "version": INDEX_FORMAT_VERSION,
+                "root": str(self.root),
+                "docs": {
+                    p: (d.doc_id, d.mtime_ns, d.size) for p, d in self._docs.items()
+                },
+                "paths": list(self._paths),
+                "postings": dict(self._postings),
+            }
+            self._dirty = False
+        self.index_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.index_file.with_name(self.index_file.name + ".tmp")
+        with open(tmp_file, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, self.index_file)
+        self._last_save = time.monotonic()
+
+    def load(self) -> bool:
+        """
+        Loads a saved index for the same root; returns whether one was loaded.
+        The file lives outside root, where tool calls cannot write.
+        """
+        if self.index_file is None:
+            return False
+        try:
+            with open(self.index_file, "rb") as f:
+                state: dict[str, Any] = pickle.load(f)
+        except Exception:
+            # A missing, truncated or outdated file just means a full rebuild
+            return False
+        if state.get("version") != INDEX_FORMAT_VERSION or state.get("root") != str(
+            self.root
+        ):
+            return False
+        with self._lock:
+            self._docs = {p: _Doc(*values) for p, values in state["docs"].items()}
+            self._paths = state["paths"]
+            self._postings = state["postings"]
+        self._ready.set()
+        return True
+
+    def _candidates(self, literals: list[str], path_prefix: str | None) -> list[str]:
+        with self._lock:
+            if not literals:
+                paths = list(self._docs)
+            else:
+                postings = []
+                for trigram in set().union(*(trigrams(lit) for lit in literals)):
+                    ids_with_trigram = self._postings.get(trigram)
+                    if ids_with_trigram is None:
+                        return []
+                    postings.append(ids_with_trigram)
+                postings.sort(key=len)
+                ids = set(postings[0])
+                for other in postings[1:]:
+                    if len(ids) <= CANDIDATES_WORTH_READING:
+                        break
+                    ids.intersection_update(other)
+                paths = [p for p in (self._paths[i] for i in ids) if p is not None]
+        if path_prefix:
+            paths = [p for p in paths if p.startswith(path_prefix)]
+        return sorted(paths)
+
+    def search(
+        self,
+        pattern: str,
+        regex: bool = False,
+        ignore_case: bool = False,
+        path_prefix: str | None = None,
+        max_results: int = 100,
+    ) -> tuple[list[GrepMatch], bool]:
+        """
+        Returns up to max_results matching line spans, ordered by path and
+        line, and whether more matches were left out. Raises re.error for an
+        invalid regex.
+        """
+        flags = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+        compiled = re.compile(pattern if regex else re.escape(pattern), flags)
+        matches: list[GrepMatch] = []
+        for rel_path in self._candidates(
+            required_literals(pattern, regex), path_prefix
+        ):
+            text = self._read(rel_path)
+            if text is None:
+                continue
+            line_starts: list[int] | None = None
+            last_span = None
+            for match in compiled.finditer(text):
+                if line_starts is None:
+                    line_starts = [0]
+                    line_starts.extend(m.end() for m in re.finditer("\n", text))
+                first, last = _span_lines(line_starts, match.start(), match.end())
+                if (first, last) == last_span:
+                    continue  # Several matches on the same lines
+                if len(matches) == max_results:
+                    return matches, True
+                last_span = (first, last)
+                end = line_starts[last] - 1 if last < len(line_starts) else len(text)
+                snippet = text[line_starts[first - 1] : end]
+                matches.append(
+                    GrepMatch(
+                        rel_path, f"L{first}-L{last}", snippet[:MAX_MATCH_TEXT_CHARS]
+                    )
+                )
+        return matches, False
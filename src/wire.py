@@ -0,0 +1,112 @@
+import gzip
+import json
+from dataclasses import dataclass
+from typing import Any
+
+try:
+    import msgpack
+except ImportError:  # Optional: tool results fall back to JSON
+    msgpack = None  # type: ignore[assignment]
+
+try:
+    import zstandard
+except ImportError:  # Optional: compression falls back to gzip
+    zstandard = None  # type: ignore[assignment]
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+# Smaller bodies fit in a packet or two, where compressing only costs CPU
+COMPRESSION_MIN_BYTES = 1024
+GZIP_LEVEL = 5
+ZSTD_LEVEL = 3
+
+
+@dataclass(frozen=True)
+class WireFormat:
+    """
+    The negotiated body encoding and content coding of one response.
+    """
+
+    media_type: str = JSON_MEDIA_TYPE
+    encoding: str | None = None
+
+
+def _accepted(header: str | None) -> dict[str, float]:
+    """
+    Parses an Accept or Accept-Encoding header into {token: q}.
+    """
+    accepted: dict[str, float] = {}
+    for item in (header or "").split(","):
+        token, *params = (part.strip() for part in item.split(";"))
+        if not token:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[token.lower()] = q
+    return accepted
+
+
+def negotiate(accept: str | None, accept_encoding: str | None) -> WireFormat:
+    """
+    Picks MessagePack when the client prefers it and it is installed, and the
+    best of zstd/gzip the client accepts. Ties go to the cheaper-to-decode
+    option (MessagePack, zstd).
+    """
+    media_types = _accepted(accept)
+    media_type = JSON_MEDIA_TYPE
+    msgpack_q = media_types.get(MSGPACK_MEDIA_TYPE, 0.0)
+    if msgpack is not None and msgpack_q > 0:
+        json_q = media_types.get(JSON_MEDIA_TYPE, media_types.get("*/*", 0.0))
+        if msgpack_q >= json_q:
+            media_type = MSGPACK_MEDIA_TYPE
+
+    codings = _accepted(accept_encoding)
+    candidates = [("zstd", codings.get("zstd", 0.0))] if zstandard is not None else []
+    candidates.append(("gzip", codings.get("gzip", codings.get("*", 0.0))))
+    encoding, q = max(candidates, key=lambda c: c[1])
+    return WireFormat(media_type, encoding if q > 0 else None)
+
+
+def encode(payload: Any, wire: WireFormat) -> bytes:
+    if wire.media_type == MSGPACK_MEDIA_TYPE:
+        return msgpack.packb(payload)  # type: ignore[no-any-return]
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def compress(body: bytes, encoding: str | None) -> tuple[bytes, str | None]:
+    """
+    Compresses body with the given content coding when it is large enough.
+    Returns the body and the Content-Encoding to send, if any.
+    """
+    if encoding is None or len(body) < COMPRESSION_MIN_BYTES:
+        return body, None
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body), "zstd"
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0), "gzip"
+
+
+def accept_header() -> str:
+    """
+    The Accept header a client sends to receive tool results compactly.
+    """
+    if msgpack is None:
+        return JSON_MEDIA_TYPE
+    return f"{MSGPACK_MEDIA_TYPE}, {JSON_MEDIA_TYPE};q=0.9"
+
+
+def decode(content: bytes, content_type: str | None) -> Any:
+    """
+    Decodes a response body straight from bytes according to its Content-Type.
+    """
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type == MSGPACK_MEDIA_TYPE:
+        if msgpack is None:
+            raise ValueError("Received MessagePack but msgpack is not installed")
+        return msgpack.unpackb(content)
+    return json.loads(content)
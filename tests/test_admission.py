@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+
+from src.admission import (
+    AdmissionController,
+    AdmissionRejected,
+    ConcurrencyLimiter,
+    RateLimiter,
+    TokenBucket,
+    create_admission_controller,
+)
+
+
+# --- Tests for TokenBucket / RateLimiter ---
+@pytest.mark.success
+def test_token_bucket_allows_burst_then_reports_wait():
+    bucket = TokenBucket(rate=10, burst=2)
+    assert bucket.try_acquire() == 0
+    assert bucket.try_acquire() == 0
+    assert 0 < bucket.try_acquire() <= 0.1
+
+
+@pytest.mark.success
+def test_rate_limiter_isolates_keys():
+    limiter = RateLimiter(rate=1, burst=1)
+    limiter.check("trace-a")
+    with pytest.raises(AdmissionRejected) as exc_info:
+        limiter.check("trace-a")
+    assert exc_info.value.status_code == 429
+    assert exc_info.value.retry_after_header == "1"
+    limiter.check("trace-b")
+
+
+@pytest.mark.edge_case
+def test_rate_limiter_evicts_least_recently_used_keys():
+    limiter = RateLimiter(rate=1, burst=1, max_keys=2)
+    limiter.check("a")
+    limiter.check("b")
+    limiter.check("c")  # Evicts "a", whose next request starts a fresh bucket
+    limiter.check("a")
+    with pytest.raises(AdmissionRejected):
+        limiter.check("c")
+
+
+# --- Tests for ConcurrencyLimiter ---
+@pytest.mark.success
+@pytest.mark.asyncio
+async def test_concurrency_limiter_hands_slots_over_in_order():
+    limiter = ConcurrencyLimiter(limit=1, queue_size=2, queue_timeout=1.0)
+    await limiter.acquire()
+    order = []
+
+    async def wait(name):
+        await limiter.acquire()
+        order.append(name)
+
+    tasks = [asyncio.create_task(wait("first")), asyncio.create_task(wait("second"))]
+    await asyncio.sleep(0)
+    limiter.release()
+    await asyncio.sleep(0)
+    limiter.release()
+    await asyncio.gather(*tasks)
+    assert order == ["first", "second"]
+    assert limiter.in_flight == 1
+
+
+@pytest.mark.error
+@pytest.mark.asyncio
+async def test_concurrency_limiter_rejects_when_queue_full():
+    limiter = ConcurrencyLimiter(limit=1, queue_size=0, queue_timeout=1.0)
+    await limiter.acquire()
+    with pytest.raises(AdmissionRejected) as exc_info:
+        await limiter.acquire()
+    assert exc_info.value.status_code == 503
+    assert exc_info.value.reason == "queue full"
+
+
+@pytest.mark.error
+@pytest.mark.asyncio
+async def test_concurrency_limiter_rejects_after_queue_timeout():
+    limiter = ConcurrencyLimiter(limit=1, queue_size=1, queue_timeout=0.01)
+    await limiter.acquire()
+    with pytest.raises(AdmissionRejected) as exc_info:
+        await limiter.acquire()
+    assert exc_info.value.reason == "queue timeout"
+    limiter.release()
+    assert limiter.in_flight == 0
+
+
+@pytest.mark.edge_case
+@pytest.mark.asyncio
+async def test_cancelled_waiter_leaves_the_queue():
+    limiter = ConcurrencyLimiter(limit=1, queue_size=1, queue_timeout=1.0)
+    await limiter.acquire()
+    task = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    limiter.release()
+    assert limiter.in_flight == 0
+
+
+# --- Tests for AdmissionController ---
+@pytest.mark.success
+@pytest.mark.asyncio
+async def test_admit_releases_slot_and_skips_unclassified():
+    limiter = ConcurrencyLimiter(limit=1, queue_size=0, queue_timeout=1.0)
+    controller = AdmissionController({"read": limiter}, RateLimiter(rate=1, burst=1))
+    async with controller.admit("read", "trace-1"):
+        assert limiter.in_flight == 1
+    assert limiter.in_flight == 0
+    for _ in range(3):
+        async with controller.admit(None, "trace-1"):
+            pass
+
+
+@pytest.mark.success
+def test_create_admission_controller_reads_environment(monkeypatch):
+    monkeypatch.setenv("MCP_CONCURRENCY_LIST", "2:3")
+    monkeypatch.setenv("MCP_RATE_LIMIT", "0")
+    controller = create_admission_controller()
+    list_limiter = controller.limiters["list"]
+    assert (list_limiter.limit, list_limiter.queue_size) == (2, 3)
+    assert controller.rate_limiter is None
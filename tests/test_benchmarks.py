@@ -0,0 +1,146 @@
+import pytest
+
+from benchmarks.compare import compare
+from benchmarks.dataset import (
+    DATA_DIR_NAME,
+    MIN_FILE_SIZE_BYTES,
+    file_path,
+    generate,
+    load_manifest,
+)
+from benchmarks.harness import SERVER_ADMISSION_ENV
+from benchmarks.startup import (
+    breakdown,
+    entry_point_records,
+    parse_importtime,
+    run_once,
+)
+from src.admission import DEFAULT_LIMITS
+from src.main import ALLOWED_EXTENSIONS, MAX_FILE_SIZE_BYTES
+
+
+# --- Tests for the dataset generator ---
+@pytest.mark.success
+def test_generate_writes_files_within_limits(tmp_path):
+    manifest = generate(tmp_path, 50, seed=1)
+
+    files = sorted(p for p in (tmp_path / DATA_DIR_NAME).rglob("*") if p.is_file())
+    assert len(files) == 50
+    assert manifest.total_bytes == sum(p.stat().st_size for p in files)
+    for p in files:
+        assert MIN_FILE_SIZE_BYTES <= p.stat().st_size <= MAX_FILE_SIZE_BYTES
+        assert p.suffix in ALLOWED_EXTENSIONS
+    assert (tmp_path / DATA_DIR_NAME / file_path(49)).is_file()
+    assert load_manifest(tmp_path) == manifest
+
+
+@pytest.mark.success
+def test_generate_is_deterministic(tmp_path):
+    generate(tmp_path / "a", 20, seed=3)
+    generate(tmp_path / "b", 20, seed=3)
+    for index in (0, 7, 19):
+        a = tmp_path / "a" / DATA_DIR_NAME / file_path(index)
+        b = tmp_path / "b" / DATA_DIR_NAME / file_path(index)
+        assert a.read_text() == b.read_text()
+
+
+@pytest.mark.edge_case
+def test_generate_reuses_matching_tree(tmp_path):
+    generate(tmp_path, 10, seed=0)
+    marker = tmp_path / DATA_DIR_NAME / file_path(0)
+    marker.write_text("unchanged")
+
+    generate(tmp_path, 10, seed=0)
+    assert marker.read_text() == "unchanged"
+
+    generate(tmp_path, 10, seed=1)
+    assert marker.read_text() != "unchanged"
+
+
+# --- Tests for compare ---
+def results(**benchmarks):
+    return {"meta": {"scale": "1k"}, "results": benchmarks}
+
+
+@pytest.mark.success
+def test_compare_flags_regressions():
+    baseline = results(
+        read_file={"p50_ms": 10.0, "p95_ms": 20.0, "throughput_rps": 100}
+    )
+    current = results(read_file={"p50_ms": 10.5, "p95_ms": 30.0, "throughput_rps": 70})
+
+    rows = {row["metric"]: row for row in compare(baseline, current, threshold=0.2)}
+    assert not rows["p50_ms"]["regression"]
+    assert rows["p95_ms"]["regression"]
+    assert rows["p95_ms"]["change"] == pytest.approx(0.5)
+    assert rows["throughput_rps"]["regression"]
+    assert rows["throughput_rps"]["change"] == pytest.approx(0.3)
+
+
+@pytest.mark.edge_case
+def test_compare_skips_benchmarks_missing_from_baseline():
+    baseline = results(read_file={"p95_ms": 20.0})
+    current = results(read_file={"p95_ms": 10.0}, write_file={"p95_ms": 99.0})
+
+    rows = compare(baseline, current, threshold=0.1)
+    assert [(row["benchmark"], row["regression"]) for row in rows] == [
+        ("read_file", False)
+    ]
+
+
+@pytest.mark.error
+def test_compare_flags_a_rise_in_errors():
+    baseline = results(
+        read_file={"requests": 1000, "errors": 0},
+        write_file={"requests": 1000, "errors": 0},
+    )
+    current = results(
+        read_file={"requests": 1000, "errors": 1},
+        write_file={"requests": 900, "errors": 100},
+    )
+
+    rows = {row["benchmark"]: row for row in compare(baseline, current, threshold=0.2)}
+    assert not rows["read_file"]["regression"]
+    assert rows["write_file"]["metric"] == "error_rate"
+    assert rows["write_file"]["change"] == pytest.approx(0.1)
+    assert rows["write_file"]["regression"]
+
+
+@pytest.mark.success
+def test_benchmark_server_pins_every_admission_limit():
+    for endpoint_class in DEFAULT_LIMITS:
+        assert f"MCP_CONCURRENCY_{endpoint_class.upper()}" in SERVER_ADMISSION_ENV
+
+
+# --- Tests for the startup benchmark ---
+IMPORTTIME_OUTPUT = """\
+import time: self [us] | cumulative | imported package
+import time:       900 |        900 | encodings
+import time:       400 |       1400 | site
+import time:       100 |        100 |     _locale
+import time:       300 |        400 |   locale
+import time:       200 |        600 | argparse
+import time:        50 |         50 | src
+"""
+
+
+@pytest.mark.success
+def test_parse_importtime_keeps_entry_point_imports():
+    records = entry_point_records(parse_importtime(IMPORTTIME_OUTPUT))
+
+    assert [(r.depth, r.module) for r in records] == [
+        (2, "_locale"),
+        (1, "locale"),
+        (0, "argparse"),
+        (0, "src"),
+    ]
+    assert sum(r.cumulative_us for r in records if r.depth == 0) == 650
+    assert breakdown(records, 2) == [("locale", 0.3), ("argparse", 0.2)]
+
+
+@pytest.mark.error
+def test_run_once_rejects_an_unexpected_exit_code():
+    with pytest.raises(RuntimeError, match="exited with code 3, expected 0"):
+        run_once(["-c", "raise SystemExit(3)"])
+    wall_ms, _ = run_once(["-c", "raise SystemExit(3)"], expected_exit_code=3)
+    assert wall_ms > 0
@@ -0,0 +1,69 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).parent.parent
+
+
+def loaded_modules(code, modules, env=None):
+    """Runs code in a fresh interpreter and returns which of modules it loaded."""
+    check = (
+        f"import json, sys\n{code}\n"
+        f"print(json.dumps([m for m in {modules!r} if m in sys.modules]))"
+    )
+    completed = subprocess.run(
+        [sys.executable, "-c", check],
+        cwd=REPO_ROOT,
+        env={**os.environ, **(env or {})},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(completed.stdout)
+
+
+@pytest.mark.success
+def test_importing_cli_loads_no_heavy_modules():
+    heavy = ["httpx", "yaml", "asyncio", "src.orchestrator"]
+    assert loaded_modules("import src.cli", heavy) == []
+
+
+@pytest.mark.success
+def test_importing_orchestrator_defers_httpx_and_yaml():
+    assert loaded_modules("import src.orchestrator", ["httpx", "yaml"]) == []
+
+
+@pytest.mark.success
+def test_importing_main_has_no_side_effects(tmp_path):
+    base_dir = tmp_path / "data"
+    code = "import src.main\nassert not src.main.BASE_DIR.exists()"
+    loaded_modules(code, [], env={"MCP_BASE_DIR": str(base_dir)})
+    assert not base_dir.exists()
+
+
+@pytest.mark.success
+def test_cli_help_exits_cleanly():
+    completed = subprocess.run(
+        [sys.executable, "-m", "src.cli", "--help"],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    assert completed.returncode == 0
+    assert "--hermes-output" in completed.stdout
+
+
+@pytest.mark.error
+def test_cli_without_output_is_a_usage_error():
+    completed = subprocess.run(
+        [sys.executable, "-m", "src.cli"],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    assert completed.returncode == 2
+    assert "Either --hermes-output or --hermes-output-file" in completed.stderr
@@ -0,0 +1,138 @@
+import os
+import time
+
+import pytest
+
+from src.journal import BLOBS_DIR, WriteJournal
+
+
+@pytest.fixture
+def root(tmp_path):
+    root = tmp_path / "data"
+    root.mkdir()
+    return root
+
+
+@pytest.fixture
+def journal(root, tmp_path):
+    return WriteJournal(root, tmp_path / "journal")
+
+
+def write(root, journal, trace_id, rel_path, content, append=False):
+    journal.record(trace_id, rel_path, append=append)
+    (root / rel_path).parent.mkdir(parents=True, exist_ok=True)
+    with open(root / rel_path, "a" if append else "w", encoding="utf-8") as f:
+        f.write(content)
+
+
+def blobs(journal):
+    return list(journal.journal_dir.rglob(f"{BLOBS_DIR}/*"))
+
+
+@pytest.mark.success
+def test_rollback_restores_every_kind_of_write(root, journal):
+    (root / "appended.txt").write_text("log\n")
+    (root / "overwritten.txt").write_text("old")
+    write(root, journal, "t1", "appended.txt", "more\n", append=True)
+    write(root, journal, "t1", "overwritten.txt", "new")
+    write(root, journal, "t1", "created.txt", "hello")
+
+    restored = journal.rollback("t1")
+
+    assert sorted(restored) == ["appended.txt", "created.txt", "overwritten.txt"]
+    assert (root / "appended.txt").read_text() == "log\n"
+    assert (root / "overwritten.txt").read_text() == "old"
+    assert not (root / "created.txt").exists()
+    assert list(journal.journal_dir.iterdir()) == []
+
+
+@pytest.mark.success
+def test_append_keeps_only_the_prior_length(root, journal):
+    (root / "big.log").write_text("x" * 100_000)
+    write(root, journal, "t1", "big.log", "y", append=True)
+    write(root, journal, "t1", "big.log", "z", append=True)
+
+    assert blobs(journal) == []
+    journal.rollback("t1")
+    assert (root / "big.log").read_text() == "x" * 100_000
+
+
+@pytest.mark.success
+def test_only_the_first_overwrite_is_snapshotted(root, journal):
+    (root / "a.txt").write_text("same")
+    (root / "b.txt").write_text("same")
+    write(root, journal, "t1", "a.txt", "v1")
+    write(root, journal, "t1", "a.txt", "v2")
+    write(root, journal, "t1", "b.txt", "v1")
+
+    # Identical prior contents share one blob
+    assert len(blobs(journal)) == 1
+    journal.rollback("t1")
+    assert (root / "a.txt").read_text() == "same"
+    assert (root / "b.txt").read_text() == "same"
+
+
+@pytest.mark.edge_case
+def test_overwrite_after_append_restores_the_original(root, journal):
+    (root / "a.txt").write_text("original")
+    write(root, journal, "t1", "a.txt", "+appended", append=True)
+    write(root, journal, "t1", "a.txt", "replaced")
+    write(root, journal, "t1", "a.txt", "+again", append=True)
+
+    journal.rollback("t1")
+    assert (root / "a.txt").read_text() == "original"
+
+
+@pytest.mark.edge_case
+def test_rollback_removes_directories_the_trace_created(root, journal):
+    (root / "kept").mkdir()
+    write(root, journal, "t1", "new/deep/a.txt", "a")
+    write(root, journal, "t1", "new/b.txt", "b")
+    write(root, journal, "t1", "kept/c.txt", "c")
+    # Written outside the trace, so its directory must stay
+    (root / "new" / "other").mkdir()
+    (root / "new" / "other" / "d.txt").write_text("d")
+
+    journal.rollback("t1")
+    assert sorted(p.relative_to(root).as_posix() for p in root.rglob("*")) == [
+        "kept",
+        "new",
+        "new/other",
+        "new/other/d.txt",
+    ]
+
+
+@pytest.mark.edge_case
+def test_traces_are_isolated(root, journal):
+    write(root, journal, "t1", "a.txt", "from t1")
+    write(root, journal, "t2", "b.txt", "from t2")
+
+    assert journal.rollback("t1") == ["a.txt"]
+    assert (root / "b.txt").read_text() == "from t2"
+    assert journal.commit("t2") == ["b.txt"]
+    assert journal.rollback("t2") == []
+    assert (root / "b.txt").read_text() == "from t2"
+
+
+@pytest.mark.edge_case
+def test_journal_survives_a_new_instance(root, journal, tmp_path):
+    (root / "a.txt").write_text("old")
+    write(root, journal, "t1", "a.txt", "new")
+
+    reopened = WriteJournal(root, tmp_path / "journal")
+    write(root, reopened, "t1", "a.txt", "newer")
+    reopened.rollback("t1")
+    assert (root / "a.txt").read_text() == "old"
+
+
+@pytest.mark.edge_case
+def test_commit_expires_abandoned_journals(root, journal):
+    write(root, journal, "abandoned", "a.txt", "x")
+    (stale_dir,) = journal.journal_dir.iterdir()
+    old = time.time() - 7200
+    for path in stale_dir.iterdir():
+        os.utime(path, (old, old))
+    write(root, journal, "t1", "b.txt", "y")
+
+    journal.commit("t1")
+    assert list(journal.journal_dir.iterdir()) == []
@@ -1,14 +1,19 @@
 import shutil
+import threading
 from pathlib import Path
 
 import pytest
 from fastapi.testclient import TestClient
 
+import src.main
+import src.wire as wire_module
+from src.admission import RateLimiter, create_admission_controller
 from src.main import (  # Import BASE_DIR and MAX_FILE_SIZE_BYTES
     BASE_DIR,
     MAX_FILE_SIZE_BYTES,
     app,
 )
+from src.wire import MSGPACK_MEDIA_TYPE, accept_header, decode
 
 
 @pytest.fixture(scope="function")
@@ -35,6 +40,14 @@ def tmp_app_data_dir(tmp_path):  # Use pytest's tmp_path fixture
 client = TestClient(app)
 
 
+@pytest.fixture(autouse=True)
+def fresh_admission(monkeypatch):
+    """Gives each test its own limits, so earlier tests never use up a bucket."""
+    controller = create_admission_controller()
+    monkeypatch.setattr(src.main, "admission", controller)
+    return controller
+
+
 @pytest.mark.success
 def test_read_root():
     response = client.get("/")
@@ -200,6 +213,229 @@ def test_trace_id_propagation(tmp_app_data_dir):
     assert "trace_test.txt" in response.json()["files"]
 
 
+@pytest.mark.success
+def test_trace_id_echoed_or_generated(tmp_app_data_dir):
+    response = client.get("/list_files", headers={"X-Trace-ID": "trace-echo"})
+    assert response.headers["X-Trace-ID"] == "trace-echo"
+
+    response = client.get("/list_files")
+    assert response.headers["X-Trace-ID"]
+
+
+@pytest.mark.error
+def test_unwritable_trace_file_does_not_fail_requests(tmp_app_data_dir, monkeypatch):
+    monkeypatch.setattr(src.main.tracer, "trace_file", str(tmp_app_data_dir))
+    response = client.get("/list_files")
+    assert response.status_code == 200
+
+
+@pytest.mark.success
+def test_metrics_endpoint(tmp_app_data_dir):
+    (tmp_app_data_dir / "metrics.txt").write_text("content")
+    client.get("/read_file?file_path=metrics.txt")
+    client.get("/read_file?file_path=missing.txt")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    assert (
+        'mcp_http_requests_total{endpoint="/read_file",method="GET",status="200"}'
+        in text
+    )
+    assert (
+        'mcp_http_requests_total{endpoint="/read_file",method="GET",status="404"}'
+        in text
+    )
+    assert 'mcp_http_request_duration_seconds_count{endpoint="/read_file"}' in text
+    for span in ("validate_path", "disk_io", "serialize", "GET /read_file"):
+        assert f'mcp_span_duration_seconds_count{{span="{span}"}}' in text
+
+
+@pytest.mark.success
+def test_profile_header_writes_profile(tmp_app_data_dir, tmp_path, monkeypatch):
+    monkeypatch.setenv("PROFILE_DIR", str(tmp_path / "profiles"))
+    monkeypatch.setattr(src.main, "PROFILE_HEADER_ENABLED", True)
+    response = client.get(
+        "/list_files", headers={"X-Trace-ID": "profiled-trace", "X-Profile": "1"}
+    )
+    assert response.status_code == 200
+    assert len(list((tmp_path / "profiles").glob("mcp-*.folded"))) == 1
+
+
+@pytest.mark.edge_case
+def test_profile_header_ignored_unless_enabled(tmp_app_data_dir, tmp_path, monkeypatch):
+    monkeypatch.setenv("PROFILE_DIR", str(tmp_path / "profiles"))
+    response = client.get("/list_files", headers={"X-Profile": "1"})
+    assert response.status_code == 200
+    assert not (tmp_path / "profiles").exists()
+
+
+@pytest.mark.skipif(wire_module.msgpack is None, reason="msgpack not installed")
+@pytest.mark.success
+def test_read_file_negotiates_msgpack_and_compression(tmp_app_data_dir):
+    content = "line of text\n" * 1000
+    (tmp_app_data_dir / "big.txt").write_text(content)
+
+    response = client.get(
+        "/read_file",
+        params={"file_path": "big.txt"},
+        headers={"Accept": accept_header(), "Accept-Encoding": "gzip"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == MSGPACK_MEDIA_TYPE
+    assert response.headers["content-encoding"] == "gzip"
+    assert int(response.headers["content-length"]) < len(content) / 10
+    assert decode(response.content, response.headers["content-type"]) == {
+        "content": content
+    }
+
+
+@pytest.mark.edge_case
+def test_small_response_is_not_compressed(tmp_app_data_dir):
+    (tmp_app_data_dir / "small.txt").write_text("hi")
+    response = client.get(
+        "/read_file",
+        params={"file_path": "small.txt"},
+        headers={"Accept-Encoding": "gzip, zstd"},
+    )
+    assert response.headers["content-type"] == "application/json"
+    assert "content-encoding" not in response.headers
+    assert response.json() == {"content": "hi"}
+
+
+@pytest.mark.success
+def test_grep_finds_written_files(tmp_app_data_dir, monkeypatch):
+    monkeypatch.setattr(src.main, "_search_index", None)
+    (tmp_app_data_dir / "a.txt").write_text("alpha\nneedle here\n")
+    (tmp_app_data_dir / "b.bin").write_text("needle")
+
+    response = client.get("/grep", params={"pattern": "needle"})
+    assert response.status_code == 200
+    assert response.json() == {
+        "matches": [{"path": "a.txt", "span": "L2-L2", "text": "needle here"}],
+        "truncated": False,
+    }
+
+    client.post("/write_file?file_path=sub/c.md", json={"content": "x\nNeedle"})
+    response = client.get(
+        "/grep", params={"pattern": "^needle", "regex": "true", "ignore_case": "true"}
+    )
+    assert [(m["path"], m["span"]) for m in response.json()["matches"]] == [
+        ("a.txt", "L2-L2"),
+        ("sub/c.md", "L2-L2"),
+    ]
+
+
+@pytest.mark.error
+def test_grep_invalid_regex(tmp_app_data_dir, monkeypatch):
+    monkeypatch.setattr(src.main, "_search_index", None)
+    response = client.get("/grep", params={"pattern": "(", "regex": "true"})
+    assert response.status_code == 400
+    assert "Invalid regex" in response.json()["detail"]
+
+
+@pytest.mark.edge_case
+def test_grep_waits_for_the_first_index_build(tmp_app_data_dir, monkeypatch):
+    monkeypatch.setattr(src.main, "_search_index", None)
+    monkeypatch.setattr(src.main, "INDEX_BUILD_WAIT_SECONDS", 0.0)
+    (tmp_app_data_dir / "a.txt").write_text("needle")
+    index = src.main.get_search_index()
+    release = threading.Event()
+    build = index.refresh
+
+    def slow_refresh():
+        release.wait(5)
+        return build()
+
+    monkeypatch.setattr(index, "refresh", slow_refresh)
+    response = client.get("/grep", params={"pattern": "needle"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == src.main.INDEX_BUILD_RETRY_AFTER
+
+    release.set()
+    assert index.wait_ready(5)
+    response = client.get("/grep", params={"pattern": "needle"})
+    assert [m["path"] for m in response.json()["matches"]] == ["a.txt"]
+
+
+@pytest.mark.success
+def test_rollback_undoes_journaled_writes(tmp_app_data_dir, monkeypatch):
+    monkeypatch.setattr(src.main, "_journal", None)
+    monkeypatch.setattr(src.main, "_search_index", None)
+    (tmp_app_data_dir / "log.txt").write_text("before\n")
+    headers = {"X-Trace-ID": "trace-rb", "X-Journal": "1"}
+    client.post(
+        "/write_file?file_path=log.txt&mode=append",
+        json={"content": "during\n"},
+        headers=headers,
+    )
+    client.post(
+        "/write_file?file_path=new/x.md", json={"content": "x"}, headers=headers
+    )
+    # Without X-Journal the write is not undone
+    client.post("/write_file?file_path=kept.md", json={"content": "y"})
+    assert client.get("/grep", params={"pattern": "during"}).json()["matches"]
+
+    response = client.post("/rollback", headers={"X-Trace-ID": "trace-rb"})
+    assert response.status_code == 200
+    assert sorted(response.json()["files"]) == ["log.txt", "new/x.md"]
+    assert (tmp_app_data_dir / "log.txt").read_text() == "before\n"
+    assert not (tmp_app_data_dir / "new").exists()
+    assert (tmp_app_data_dir / "kept.md").exists()
+    assert client.get("/grep", params={"pattern": "during"}).json()["matches"] == []
+
+
+@pytest.mark.success
+def test_commit_keeps_journaled_writes(tmp_app_data_dir, monkeypatch):
+    monkeypatch.setattr(src.main, "_journal", None)
+    headers = {"X-Trace-ID": "trace-c", "X-Journal": "1"}
+    client.post("/write_file?file_path=a.txt", json={"content": "x"}, headers=headers)
+
+    response = client.post("/commit", headers={"X-Trace-ID": "trace-c"})
+    assert response.json() == {"files": ["a.txt"]}
+    response = client.post("/rollback", headers={"X-Trace-ID": "trace-c"})
+    assert response.json() == {"files": []}
+    assert (tmp_app_data_dir / "a.txt").read_text() == "x"
+
+
+@pytest.mark.error
+def test_rollback_requires_trace_id(tmp_app_data_dir):
+    assert client.post("/rollback").status_code == 422
+
+
+@pytest.mark.error
+def test_rate_limited_trace_gets_429(tmp_app_data_dir, fresh_admission):
+    fresh_admission.rate_limiter = RateLimiter(rate=0.5, burst=1)
+    headers = {"X-Trace-ID": "runaway"}
+    assert client.get("/list_files", headers=headers).status_code == 200
+
+    response = client.get("/list_files", headers=headers)
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "2"
+    assert response.headers["X-Trace-ID"] == "runaway"
+    assert client.get("/list_files", headers={"X-Trace-ID": "other"}).status_code == 200
+    assert (
+        'mcp_admission_rejected_total{endpoint="/list_files",reason="rate limited"} 1'
+        in (client.get("/metrics").text)
+    )
+
+
+@pytest.mark.error
+def test_saturated_endpoint_class_gets_503(tmp_app_data_dir, fresh_admission):
+    list_limiter = fresh_admission.limiters["list"]
+    list_limiter.queue_size = 0
+    list_limiter.in_flight = list_limiter.limit
+
+    response = client.get("/list_files")
+    assert response.status_code == 503
+    assert "Retry-After" in response.headers
+    # Other endpoint classes keep their own capacity
+    assert (
+        client.get("/read_file", params={"file_path": "missing.txt"}).status_code == 404
+    )
+
+
 @pytest.mark.success
 def test_write_file_append_mode(tmp_app_data_dir):
     file_path = "append_test.txt"
@@ -225,6 +461,47 @@ def test_write_file_append_mode(tmp_app_data_dir):
     assert response.json()["content"] == initial_content + appended_content
 
 
+@pytest.mark.success
+def test_read_file_conditional_request(tmp_app_data_dir):
+    (tmp_app_data_dir / "etag.txt").write_text("v1")
+
+    response = client.get("/read_file?file_path=etag.txt")
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    response = client.get(
+        "/read_file?file_path=etag.txt", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    assert response.content == b""
+
+    client.post(
+        "/write_file?file_path=etag.txt&mode=append", json={"content": " and v2"}
+    )
+    response = client.get(
+        "/read_file?file_path=etag.txt", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.json() == {"content": "v1 and v2"}
+    assert response.headers["ETag"] != etag
+
+
+@pytest.mark.success
+def test_list_files_conditional_request(tmp_app_data_dir):
+    (tmp_app_data_dir / "file1.txt").write_text("content1")
+
+    response = client.get("/list_files")
+    etag = response.headers["ETag"]
+
+    response = client.get("/list_files", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    (tmp_app_data_dir / "file2.txt").write_text("content2")
+    response = client.get("/list_files", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.json()["files"]) == 2
+
+
 @pytest.mark.success
 def test_write_file_creates_directories(tmp_app_data_dir):
     file_path = "new_dir/sub_dir/file.txt"
@@ -5,6 +5,19 @@ import httpx
 import pytest
 
 import src.orchestrator as orchestrator_module  # Import the module itself
+import src.wire as wire_module
+from src.resilience import RetryPolicy
+from src.schema_validation import load_validator
+from src.wire import MSGPACK_MEDIA_TYPE, WireFormat, accept_header, encode
+
+
+@pytest.fixture(autouse=True)
+def reset_resilience_state(monkeypatch):
+    """Isolates tests from the module-level breakers and skips backoff sleeps."""
+    monkeypatch.setattr(
+        orchestrator_module, "RETRY_POLICY", RetryPolicy(base_delay=0.0)
+    )
+    monkeypatch.setattr(orchestrator_module, "SERVICES", {})
 
 
 # --- Tests for extract_json_from_hermes_output ---
@@ -57,6 +70,32 @@ def test_extract_json_from_hermes_output_empty_fenced_json():
         orchestrator_module.extract_json_from_hermes_output(hermes_output)
 
 
+@pytest.mark.error
+@pytest.mark.parametrize(
+    "hermes_output",
+    [
+        '{"thought": "x", "tool_calls": [{"args": {}}]}',
+        '{"thought": "x", "tool_calls": "read_file"}',
+        '{"thought": "x", "unexpected": true}',
+        '["not", "an", "object"]',
+        '{"meta": {"version": "1.0", "intent": "x"}, "tasks": []}',
+    ],
+)
+def test_extract_json_from_hermes_output_schema_violation(hermes_output):
+    with pytest.raises(orchestrator_module.JsonExtractionError, match="does not match"):
+        orchestrator_module.extract_json_from_hermes_output(hermes_output)
+
+
+@pytest.mark.success
+def test_extract_json_from_hermes_output_accepts_schema_form():
+    hermes_output = '{"tool_calls": [{"name": "read_file", "parameters": {}}]}'
+    result = orchestrator_module.extract_json_from_hermes_output(hermes_output)
+    assert orchestrator_module.normalize_tool_call(result["tool_calls"][0]) == {
+        "tool_name": "read_file",
+        "args": {},
+    }
+
+
 # --- Mocks for httpx client ---
 @pytest.fixture
 def mock_httpx_client():
@@ -69,8 +108,11 @@ def mock_httpx_client():
         mock_response_get = AsyncMock()
         mock_response_post = AsyncMock()
 
-        mock_response_get.text = AsyncMock()
-        mock_response_post.text = AsyncMock()
+        mock_response_get.content = b""
+        mock_response_post.content = b""
+
+        mock_response_get.headers = {}
+        mock_response_post.headers = {}
 
         mock_response_get.raise_for_status = MagicMock()
         mock_response_post.raise_for_status = MagicMock()
@@ -86,7 +128,9 @@ def mock_httpx_client():
 @pytest.mark.asyncio
 async def test_execute_tool_call_list_files_success(mock_httpx_client):
     mock_httpx_client.get.return_value.status_code = 200
-    mock_httpx_client.get.return_value.text = json.dumps({"files": ["a.txt"]})  # 変更
+    mock_httpx_client.get.return_value.content = json.dumps(
+        {"files": ["a.txt"]}
+    ).encode()  # 変更
     mock_httpx_client.get.return_value.raise_for_status.return_value = None
 
     tool_call = {"tool_name": "list_files", "args": {"extensions": ".txt"}}
@@ -94,7 +138,9 @@ async def test_execute_tool_call_list_files_success(mock_httpx_client):
     result = await orchestrator_module.execute_tool_call(tool_call, trace_id)
 
     mock_httpx_client.get.assert_called_once_with(
-        "/list_files", params={"extensions": ".txt"}, headers={"X-Trace-ID": trace_id}
+        "/list_files",
+        params={"extensions": ".txt"},
+        headers={"X-Trace-ID": trace_id, "Accept": accept_header()},
     )
     assert result == {"files": ["a.txt"]}
 
@@ -103,9 +149,9 @@ async def test_execute_tool_call_list_files_success(mock_httpx_client):
 @pytest.mark.asyncio
 async def test_execute_tool_call_read_file_success(mock_httpx_client):
     mock_httpx_client.get.return_value.status_code = 200
-    mock_httpx_client.get.return_value.text = json.dumps(
+    mock_httpx_client.get.return_value.content = json.dumps(
         {"content": "file content"}
-    )  # 変更
+    ).encode()  # 変更
     mock_httpx_client.get.return_value.raise_for_status.return_value = None
 
     tool_call = {"tool_name": "read_file", "args": {"file_path": "test.txt"}}
@@ -113,7 +159,9 @@ async def test_execute_tool_call_read_file_success(mock_httpx_client):
     result = await orchestrator_module.execute_tool_call(tool_call, trace_id)
 
     mock_httpx_client.get.assert_called_once_with(
-        "/read_file", params={"file_path": "test.txt"}, headers={"X-Trace-ID": trace_id}
+        "/read_file",
+        params={"file_path": "test.txt"},
+        headers={"X-Trace-ID": trace_id, "Accept": accept_header()},
     )
     assert result == {"content": "file content"}
 
@@ -133,10 +181,12 @@ async def test_execute_tool_call_write_file_success(mock_httpx_client):
     result = await orchestrator_module.execute_tool_call(tool_call, trace_id)
 
     mock_httpx_client.post.assert_called_once_with(
-        "/write_file?file_path=test.txt",
+        "/write_file",
+        params={"file_path": "test.txt"},
         json={"content": "new content"},
-        headers={"X-Trace-ID": trace_id},
+        headers={"X-Trace-ID": trace_id, "Accept": accept_header()},
     )
+    assert tool_call["args"] == {"file_path": "test.txt", "content": "new content"}
     assert result == {}  # Corrected assertion
 
 
@@ -148,8 +198,27 @@ async def test_execute_tool_call_write_file_missing_args(mock_httpx_client):
         "args": {"file_path": "test.txt"},  # Missing 'content'
     }
     trace_id = "test-trace-id"
-    with pytest.raises(KeyError):
+    with pytest.raises(
+        orchestrator_module.PolicyError, match="missing required property 'content'"
+    ):
         await orchestrator_module.execute_tool_call(tool_call, trace_id)
+    mock_httpx_client.post.assert_not_called()
+
+
+@pytest.mark.skipif(wire_module.msgpack is None, reason="msgpack not installed")
+@pytest.mark.success
+@pytest.mark.asyncio
+async def test_execute_tool_call_decodes_msgpack(mock_httpx_client):
+    mock_httpx_client.get.return_value.status_code = 200
+    mock_httpx_client.get.return_value.headers = {"Content-Type": MSGPACK_MEDIA_TYPE}
+    mock_httpx_client.get.return_value.content = encode(
+        {"content": "x"}, WireFormat(MSGPACK_MEDIA_TYPE)
+    )
+
+    result = await orchestrator_module.execute_tool_call(
+        {"tool_name": "read_file", "args": {"file_path": "a.txt"}}, "trace-msgpack"
+    )
+    assert result == {"content": "x"}
 
 
 @pytest.mark.error
@@ -200,6 +269,454 @@ async def test_execute_tool_call_mcp_connection_error(mock_httpx_client):
         await orchestrator_module.execute_tool_call(tool_call, trace_id)
 
 
+@pytest.mark.success
+@pytest.mark.asyncio
+async def test_execute_tool_call_retries_transient_connection_error(
+    mock_httpx_client,
+):
+    ok_response = mock_httpx_client.get.return_value
+    ok_response.status_code = 200
+    ok_response.content = json.dumps({"files": []}).encode()
+    mock_httpx_client.get.side_effect = [
+        httpx.ConnectError("Connection refused", request=httpx.Request("GET", "/")),
+        ok_response,
+    ]
+
+    tool_call = {"tool_name": "list_files", "args": {}}
+    result = await orchestrator_module.execute_tool_call(tool_call, "trace-1")
+
+    assert result == {"files": []}
+    assert mock_httpx_client.get.call_count == 2
+
+
+@pytest.mark.error
+@pytest.mark.asyncio
+async def test_execute_tool_call_append_not_replayed_after_send(mock_httpx_client):
+    mock_httpx_client.post.side_effect = httpx.ReadTimeout(
+        "timed out", request=httpx.Request("POST", "/")
+    )
+
+    tool_call = {
+        "tool_name": "write_file",
+        "args": {"file_path": "log.txt", "content": "line", "mode": "append"},
+    }
+    with pytest.raises(orchestrator_module.ExecutionError):
+        await orchestrator_module.execute_tool_call(tool_call, "trace-1")
+    assert mock_httpx_client.post.call_count == 1
+
+
+@pytest.mark.error
+@pytest.mark.asyncio
+async def test_execute_tool_call_fails_fast_when_circuit_open(mock_httpx_client):
+    mock_httpx_client.get.side_effect = httpx.ConnectError(
+        "Connection refused", request=httpx.Request("GET", "/")
+    )
+    breaker = orchestrator_module.service_health(
+        orchestrator_module.MCP_BASE_URL
+    ).breaker
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+
+    tool_call = {"tool_name": "list_files", "args": {}}
+    with pytest.raises(orchestrator_module.ExecutionError, match="MCP unavailable"):
+        await orchestrator_module.execute_tool_call(tool_call, "trace-1")
+    mock_httpx_client.get.assert_not_called()
+
+
+@pytest.mark.success
+@pytest.mark.asyncio
+async def test_execute_tool_call_rag_search_from_registry(mock_httpx_client):
+    mock_httpx_client.post.return_value.status_code = 200
+    mock_httpx_client.post.return_value.content = json.dumps({"chunks": []}).encode()
+
+    tool_call = {"tool_name": "search", "args": {"query": "retry", "top_k": 3}}
+    result = await orchestrator_module.execute_tool_call(tool_call, "trace-1")
+
+    mock_httpx_client.post.assert_called_once_with(
+        "/search",
+        params={},
+        json={"query": "retry", "top_k": 3},
+        headers={"X-Trace-ID": "trace-1", "Accept": accept_header()},
+    )
+    assert result == {"chunks": []}
+
+
+@pytest.mark.error
+@pytest.mark.asyncio
+async def test_rag_failures_do_not_open_the_mcp_circuit(mock_httpx_client):
+    mock_httpx_client.post.side_effect = httpx.ConnectError(
+        "Connection refused", request=httpx.Request("POST", "/")
+    )
+    mock_httpx_client.get.return_value.status_code = 200
+    mock_httpx_client.get.return_value.content = json.dumps({"files": []}).encode()
+    rag = orchestrator_module.service_health(orchestrator_module.RAG_BASE_URL)
+    for _ in range(rag.breaker.failure_threshold):
+        rag.breaker.record_failure()
+
+    search = {"tool_name": "search", "args": {"query": "retry"}}
+    with pytest.raises(orchestrator_module.ExecutionError, match="RAG unavailable"):
+        await orchestrator_module.execute_tool_call(search, "trace-1")
+    list_files = {"tool_name": "list_files", "args": {}}
+    assert await orchestrator_module.execute_tool_call(list_files, "trace-1") == {
+        "files": []
+    }
+
+
+@pytest.mark.success
+@pytest.mark.parametrize("value, hedge", [("1", True), ("on", True), ("", False)])
+def test_retry_policy_hedging_from_env(monkeypatch, value, hedge):
+    monkeypatch.setenv("MCP_HEDGE", value)
+    assert orchestrator_module.retry_policy_from_env().hedge is hedge
+
+
+# --- Tests for ToolResultCache ---
+@pytest.mark.success
+@pytest.mark.asyncio
+async def test_execute_tool_call_cache_hit_within_run(mock_httpx_client):
+    mock_httpx_client.get.return_value.status_code = 200
+    mock_httpx_client.get.return_value.content = json.dumps(
+        {"content": "cached"}
+    ).encode()
+    cache = orchestrator_module.ToolResultCache()
+
+    tool_call = {"tool_name": "read_file", "args": {"file_path": "test.txt"}}
+    first = await orchestrator_module.execute_tool_call(tool_call, "trace-1", cache)
+    second = await orchestrator_module.execute_tool_call(tool_call, "trace-1", cache)
+
+    assert first == second == {"content": "cached"}
+    assert mock_httpx_client.get.call_count == 1
+
+
+@pytest.mark.success
+@pytest.mark.asyncio
+async def test_execute_tool_call_cache_key_ignores_arg_order(mock_httpx_client):
+    mock_httpx_client.get.return_value.status_code = 200
+    mock_httpx_client.get.return_value.content = json.dumps({"files": []}).encode()
+    cache = orchestrator_module.ToolResultCache()
+
+    await orchestrator_module.execute_tool_call(
+        {"tool_name": "list_files", "args": {"extensions": ".txt", "max_items": 2}},
+        "trace-1",
+        cache,
+    )
+    await orchestrator_module.execute_tool_call(
+        {"tool_name": "list_files", "args": {"max_items": 2, "extensions": ".txt"}},
+        "trace-1",
+        cache,
+    )
+
+    assert mock_httpx_client.get.call_count == 1
+
+
+@pytest.mark.success
+@pytest.mark.asyncio
+async def test_execute_tool_call_cache_revalidates_across_runs(mock_httpx_client):
+    mock_httpx_client.get.return_value.status_code = 200
+    mock_httpx_client.get.return_value.content = json.dumps(
+        {"content": "cached"}
+    ).encode()
+    mock_httpx_client.get.return_value.headers = {"ETag": '"abc"'}
+    cache = orchestrator_module.ToolResultCache()
+
+    tool_call = {"tool_name": "read_file", "args": {"file_path": "test.txt"}}
+    await orchestrator_module.execute_tool_call(tool_call, "trace-1", cache)
+
+    mock_httpx_client.get.return_value.status_code = 304
+    mock_httpx_client.get.return_value.content = b""
+    result = await orchestrator_module.execute_tool_call(tool_call, "trace-2", cache)
+
+    assert result == {"content": "cached"}
+    mock_httpx_client.get.assert_called_with(
+        "/read_file",
+        params={"file_path": "test.txt"},
+        headers={
+            "X-Trace-ID": "trace-2",
+            "Accept": accept_header(),
+            "If-None-Match": '"abc"',
+        },
+    )
+
+    # Revalidated entries are free for the rest of the run
+    await orchestrator_module.execute_tool_call(tool_call, "trace-2", cache)
+    assert mock_httpx_client.get.call_count == 2
+
+
+@pytest.mark.edge_case
+@pytest.mark.asyncio
+async def test_mutating_a_result_does_not_change_the_cache(mock_httpx_client):
+    mock_httpx_client.get.return_value.status_code = 200
+    mock_httpx_client.get.return_value.content = json.dumps({"files": ["a"]}).encode()
+    cache = orchestrator_module.ToolResultCache()
+    tool_call = {"tool_name": "list_files", "args": {}}
+
+    first = await orchestrator_module.execute_tool_call(tool_call, "trace-1", cache)
+    first["files"].append("mutated")
+    second = await orchestrator_module.execute_tool_call(tool_call, "trace-1", cache)
+    second["files"].clear()
+
+    third = await orchestrator_module.execute_tool_call(tool_call, "trace-1", cache)
+    assert third == {"files": ["a"]}
+    assert mock_httpx_client.get.call_count == 1
+
+
+@pytest.mark.success
+@pytest.mark.asyncio
+async def test_orchestrate_persists_cache_between_runs(
+    mock_httpx_client, monkeypatch, tmp_path
+):
+    monkeypatch.setenv("ORCHESTRATOR_CACHE_DIR", str(tmp_path))
+    mock_httpx_client.get.return_value.status_code = 200
+    mock_httpx_client.get.return_value.content = json.dumps({"content": "x"}).encode()
+    mock_httpx_client.get.return_value.headers = {"ETag": '"abc"'}
+    hermes_output = (
+        '{"tool_calls": [{"tool_name": "read_file", "args": {"file_path": "a.txt"}}]}'
+    )
+    assert await orchestrator_module.orchestrate(hermes_output) == 0
+
+    mock_httpx_client.get.return_value.status_code = 304
+    assert await orchestrator_module.orchestrate(hermes_output) == 0
+    headers = mock_httpx_client.get.call_args.kwargs["headers"]
+    assert headers["If-None-Match"] == '"abc"'
+
+
+@pytest.mark.error
+def test_unreadable_cache_file_gives_an_empty_cache(tmp_path):
+    path = tmp_path / "cache.pickle"
+    path.write_bytes(b"not a pickle")
+    assert len(orchestrator_module.ToolResultCache.load(path)) == 0
+
+
+@pytest.mark.success
+@pytest.mark.asyncio
+async def test_execute_tool_call_write_invalidates_overlapping_reads(
+    mock_httpx_client,
+):
+    mock_httpx_client.get.return_value.status_code = 200
+    mock_httpx_client.get.return_value.content = json.dumps({"content": "x"}).encode()
+    cache = orchestrator_module.ToolResultCache()
+
+    await orchestrator_module.execute_tool_call(
+        {"tool_name": "read_file", "args": {"file_path": "a.txt"}}, "trace-1", cache
+    )
+    await orchestrator_module.execute_tool_call(
+        {"tool_name": "read_file", "args": {"file_path": "b.txt"}}, "trace-1", cache
+    )
+    await orchestrator_module.execute_tool_call(
+        {"tool_name": "list_files", "args": {}}, "trace-1", cache
+    )
+    await orchestrator_module.execute_tool_call(
+        {"tool_name": "grep", "args": {"pattern": "y"}}, "trace-1", cache
+    )
+    assert len(cache) == 4
+
+    await orchestrator_module.execute_tool_call(
+        {"tool_name": "write_file", "args": {"file_path": "./a.txt", "content": "y"}},
+        "trace-1",
+        cache,
+    )
+
+    assert len(cache) == 1
+    assert cache.get(cache.make_key("read_file", {"file_path": "b.txt"})) is not None
+
+
+@pytest.mark.edge_case
+@pytest.mark.asyncio
+async def test_execute_tool_call_without_cache_always_fetches(mock_httpx_client):
+    mock_httpx_client.get.return_value.status_code = 200
+    mock_httpx_client.get.return_value.content = json.dumps({"content": "x"}).encode()
+
+    tool_call = {"tool_name": "read_file", "args": {"file_path": "a.txt"}}
+    await orchestrator_module.execute_tool_call(tool_call, "trace-1")
+    await orchestrator_module.execute_tool_call(tool_call, "trace-1")
+
+    assert mock_httpx_client.get.call_count == 2
+
+
+# --- Tests for execute_plan ---
+def make_plan(tasks, policy=None):
+    plan = {"meta": {"version": "1.0", "intent": "test"}, "tasks": tasks}
+    if policy is not None:
+        plan["on_error"] = {"policy": policy}
+    return plan
+
+
+def make_task(task_id, file_path, depends_on=()):
+    task = {
+        "id": task_id,
+        "title": f"Read {file_path}",
+        "tool": "read_file",
+        "args": {"file_path": file_path},
+    }
+    if depends_on:
+        task["depends_on"] = list(depends_on)
+    return task
+
+
+@pytest.mark.success
+@pytest.mark.asyncio
+async def test_execute_plan_runs_tasks_in_dependency_order(mock_httpx_client):
+    mock_httpx_client.get.return_value.status_code = 200
+    mock_httpx_client.get.return_value.content = json.dumps({"content": "x"}).encode()
+
+    plan = make_plan(
+        [
+            make_task("c", "c.txt", depends_on=["a", "b"]),
+            make_task("a", "a.txt"),
+            make_task("b", "b.txt", depends_on=["a"]),
+        ]
+    )
+    results = await orchestrator_module.execute_plan(plan, "trace-1")
+
+    requested = [
+        c.kwargs["params"]["file_path"] for c in mock_httpx_client.get.call_args_list
+    ]
+    assert requested == ["a.txt", "b.txt", "c.txt"]
+    assert results["c"] == {
+        "tool": "read_file",
+        "args": {"file_path": "c.txt"},
+        "result": {"ok": True, "data": {"content": "x"}},
+    }
+    validate = load_validator("tool_result.schema.json")
+    for result in results.values():
+        validate(result)
+
+
+@pytest.mark.error
+@pytest.mark.asyncio
+async def test_execute_plan_continue_skips_dependents(mock_httpx_client):
+    ok_response = mock_httpx_client.get.return_value
+    ok_response.status_code = 200
+    ok_response.content = json.dumps({"content": "x"}).encode()
+
+    async def get(path, params, headers):
+        if params["file_path"] == "missing.txt":
+            raise httpx.ConnectError("refused", request=httpx.Request("GET", "/"))
+        return ok_response
+
+    mock_httpx_client.get.side_effect = get
+    plan = make_plan(
+        [
+            make_task("a", "missing.txt"),
+            make_task("b", "b.txt", depends_on=["a"]),
+            make_task("c", "c.txt"),
+        ],
+        policy="continue",
+    )
+    results = await orchestrator_module.execute_plan(plan, "trace-1")
+
+    assert results["a"]["result"]["ok"] is False
+    assert results["b"]["result"] == {
+        "ok": False,
+        "error": "Skipped: dependency failed (a)",
+    }
+    assert results["c"]["result"]["ok"] is True
+
+
+@pytest.mark.error
+@pytest.mark.asyncio
+async def test_execute_plan_halts_by_default(mock_httpx_client):
+    mock_httpx_client.get.side_effect = httpx.ConnectError(
+        "refused", request=httpx.Request("GET", "/")
+    )
+    plan = make_plan([make_task("a", "a.txt")])
+    with pytest.raises(orchestrator_module.ExecutionError):
+        await orchestrator_module.execute_plan(plan, "trace-1")
+
+
+def make_write_task(task_id, file_path, content):
+    return {
+        "id": task_id,
+        "title": f"Write {file_path}",
+        "tool": "write_file",
+        "args": {"file_path": file_path, "content": content},
+    }
+
+
+@pytest.mark.error
+@pytest.mark.asyncio
+async def test_execute_plan_rollback_undoes_journaled_writes(mock_httpx_client):
+    mock_httpx_client.post.return_value.status_code = 200
+    mock_httpx_client.post.return_value.json = MagicMock(
+        return_value={"files": ["a.txt"]}
+    )
+    ok_response = mock_httpx_client.get.return_value
+    ok_response.status_code = 200
+    ok_response.content = json.dumps({"content": "new"}).encode()
+
+    async def get(path, params, headers):
+        if params["file_path"] == "missing.txt":
+            raise httpx.ConnectError("refused", request=httpx.Request("GET", "/"))
+        return ok_response
+
+    mock_httpx_client.get.side_effect = get
+    cache = orchestrator_module.ToolResultCache()
+    plan = make_plan(
+        [
+            make_write_task("w", "a.txt", "new"),
+            make_task("r", "a.txt", depends_on=["w"]),
+            make_task("m", "missing.txt", depends_on=["r"]),
+        ],
+        policy="rollback",
+    )
+    with pytest.raises(orchestrator_module.ExecutionError):
+        await orchestrator_module.execute_plan(plan, "trace-1", cache)
+
+    write_call, rollback_call = mock_httpx_client.post.call_args_list
+    assert write_call.kwargs["headers"]["X-Journal"] == "1"
+    assert rollback_call.args == ("/rollback",)
+    assert rollback_call.kwargs["headers"] == {"X-Trace-ID": "trace-1"}
+    assert len(cache) == 0
+
+
+@pytest.mark.success
+@pytest.mark.asyncio
+async def test_execute_plan_rollback_commits_on_success(mock_httpx_client):
+    mock_httpx_client.post.return_value.status_code = 200
+    mock_httpx_client.post.return_value.json = MagicMock(
+        return_value={"files": ["a.txt"]}
+    )
+    plan = make_plan([make_write_task("w", "a.txt", "new")], policy="rollback")
+    results = await orchestrator_module.execute_plan(plan, "trace-1")
+
+    assert results["w"]["result"]["ok"] is True
+    paths = [c.args[0] for c in mock_httpx_client.post.call_args_list]
+    assert paths == ["/write_file", "/commit"]
+
+
+@pytest.mark.success
+@pytest.mark.asyncio
+async def test_execute_plan_without_rollback_does_not_journal(mock_httpx_client):
+    mock_httpx_client.post.return_value.status_code = 200
+    plan = make_plan([make_write_task("w", "a.txt", "new")])
+    await orchestrator_module.execute_plan(plan, "trace-1")
+
+    mock_httpx_client.post.assert_called_once()
+    assert "X-Journal" not in mock_httpx_client.post.call_args.kwargs["headers"]
+
+
+@pytest.mark.error
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("tasks", "message"),
+    [
+        ([make_task("a", "a.txt"), make_task("a", "b.txt")], "Duplicate task id"),
+        ([make_task("a", "a.txt", depends_on=["z"])], "unknown tasks"),
+        (
+            [
+                make_task("a", "a.txt", depends_on=["b"]),
+                make_task("b", "b.txt", depends_on=["a"]),
+            ],
+            "Dependency cycle",
+        ),
+        ([], "Invalid plan"),
+    ],
+)
+async def test_execute_plan_rejects_invalid_plans(mock_httpx_client, tasks, message):
+    with pytest.raises(orchestrator_module.PolicyError, match=message):
+        await orchestrator_module.execute_plan(make_plan(tasks), "trace-1")
+    mock_httpx_client.get.assert_not_called()
+
+
 # --- Tests for orchestrate ---
 @pytest.mark.success
 @pytest.mark.asyncio
@@ -208,9 +725,9 @@ async def test_orchestrate_success(mock_httpx_client):
     # mock_httpx_client.post.return_value.json.return_value = {}  # 削除
     mock_httpx_client.post.return_value.raise_for_status.return_value = None
     mock_httpx_client.get.return_value.status_code = 200
-    mock_httpx_client.get.return_value.text = json.dumps(
+    mock_httpx_client.get.return_value.content = json.dumps(
         {"content": "read content"}
-    )  # 変更
+    ).encode()  # 変更
     mock_httpx_client.get.return_value.raise_for_status.return_value = None
 
     hermes_output = """
@@ -231,6 +748,131 @@ async def test_orchestrate_success(mock_httpx_client):
     assert mock_httpx_client.get.call_count == 1
 
 
+@pytest.mark.success
+@pytest.mark.asyncio
+async def test_orchestrate_deduplicates_reads(mock_httpx_client):
+    mock_httpx_client.get.return_value.status_code = 200
+    mock_httpx_client.get.return_value.content = json.dumps({"content": "x"}).encode()
+
+    hermes_output = """
+    {
+      "tool_calls": [
+        {"tool_name": "read_file", "args": {"file_path": "test.txt"}},
+        {"tool_name": "read_file", "args": {"file_path": "test.txt"}},
+        {"tool_name": "write_file", "args": {"file_path": "test.txt", "content": "y"}},
+        {"tool_name": "read_file", "args": {"file_path": "test.txt"}}
+      ]
+    }
+    """
+    exit_code = await orchestrator_module.orchestrate(hermes_output)
+    assert exit_code == 0
+    assert mock_httpx_client.get.call_count == 2
+
+
+@pytest.mark.success
+@pytest.mark.asyncio
+async def test_orchestrate_executes_plan(mock_httpx_client):
+    mock_httpx_client.get.return_value.status_code = 200
+    mock_httpx_client.get.return_value.content = json.dumps({"content": "x"}).encode()
+
+    hermes_output = json.dumps(
+        make_plan([make_task("a", "a.txt"), make_task("b", "b.txt", ["a"])])
+    )
+    exit_code = await orchestrator_module.orchestrate(hermes_output)
+    assert exit_code == 0
+    assert mock_httpx_client.get.call_count == 2
+
+
+@pytest.mark.error
+@pytest.mark.asyncio
+async def test_orchestrate_continue_plan_fails_after_running_all_tasks(
+    mock_httpx_client,
+):
+    ok_response = mock_httpx_client.get.return_value
+    ok_response.status_code = 200
+    ok_response.content = json.dumps({"content": "x"}).encode()
+
+    async def get(path, params, headers):
+        if params["file_path"] == "missing.txt":
+            raise httpx.ConnectError("refused", request=httpx.Request("GET", "/"))
+        return ok_response
+
+    mock_httpx_client.get.side_effect = get
+    plan = make_plan(
+        [make_task("a", "missing.txt"), make_task("b", "b.txt")], policy="continue"
+    )
+    exit_code = await orchestrator_module.orchestrate(json.dumps(plan))
+    assert exit_code == 1
+    requested = [
+        c.kwargs["params"]["file_path"] for c in mock_httpx_client.get.call_args_list
+    ]
+    assert "b.txt" in requested
+
+
+@pytest.mark.success
+@pytest.mark.asyncio
+async def test_orchestrate_records_spans_and_metrics(
+    mock_httpx_client, monkeypatch, tmp_path
+):
+    mock_httpx_client.get.return_value.status_code = 200
+    mock_httpx_client.get.return_value.content = json.dumps({"content": "x"}).encode()
+    tracer = orchestrator_module.tracer
+    monkeypatch.setattr(tracer, "trace_file", str(tmp_path / "trace.jsonl"))
+    monkeypatch.setattr(tracer, "metrics", type(tracer.metrics)())
+
+    hermes_output = """
+    {"tool_calls": [
+      {"tool_name": "read_file", "args": {"file_path": "a.txt"}},
+      {"tool_name": "read_file", "args": {"file_path": "a.txt"}}
+    ]}
+    """
+    assert await orchestrator_module.orchestrate(hermes_output) == 0
+
+    metrics = tracer.metrics
+    assert (
+        metrics.counter_value(
+            "orchestrator_tool_calls_total", tool="read_file", outcome="ok"
+        )
+        == 1
+    )
+    assert (
+        metrics.counter_value(
+            "orchestrator_tool_calls_total", tool="read_file", outcome="hit"
+        )
+        == 1
+    )
+
+    with open(tmp_path / "trace.jsonl", encoding="utf-8") as f:
+        (line,) = f.readlines()
+    spans = json.loads(line)["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    by_name = {}
+    for span in spans:
+        by_name.setdefault(span["name"], []).append(span)
+    (root,) = by_name["orchestrate"]
+    assert len(by_name["tool_call"]) == 2
+    assert by_name["extract_json"][0]["parentSpanId"] == root["spanId"]
+    assert {span["traceId"] for span in spans} == {root["traceId"]}
+
+
+@pytest.mark.success
+@pytest.mark.asyncio
+async def test_orchestrate_profile_requests_server_profile(
+    mock_httpx_client, monkeypatch, tmp_path
+):
+    monkeypatch.setenv("PROFILE_DIR", str(tmp_path))
+    mock_httpx_client.get.return_value.status_code = 200
+    mock_httpx_client.get.return_value.content = json.dumps({"content": "x"}).encode()
+
+    hermes_output = (
+        '{"tool_calls": [{"tool_name": "read_file", "args": {"file_path": "a.txt"}}]}'
+    )
+    assert await orchestrator_module.orchestrate(hermes_output, profile=True) == 0
+
+    headers = mock_httpx_client.get.call_args.kwargs["headers"]
+    assert headers["X-Profile"] == "1"
+    assert len(list(tmp_path.glob("orchestrator-*.folded"))) == 1
+
+
 @pytest.mark.error
 @pytest.mark.asyncio
 async def test_orchestrate_json_extraction_error():
@@ -317,7 +959,5 @@ async def test_orchestrate_tool_call_missing_args(mock_httpx_client):
     ```
     """
     exit_code = await orchestrator_module.orchestrate(hermes_output)
-    assert (
-        exit_code == 1
-    )  # ExecutionError: missing 'content' in write_file argsrguments for the tool cause an ExecutionError
-    assert exit_code == 1
+    assert exit_code == 2  # PolicyError: args are validated before any request
+    mock_httpx_client.post.assert_not_called()
@@ -0,0 +1,139 @@
+import threading
+import time
+
+import pytest
+
+from src.profiling import (
+    SamplingProfiler,
+    is_profiling,
+    maybe_profile,
+    profile_settings,
+)
+from src.tracing import MetricsRegistry, Tracer, otlp_trace_id
+
+
+def busy_work(seconds):
+    deadline = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < deadline:
+        total += 1
+    return total
+
+
+@pytest.fixture
+def tracer(tmp_path, monkeypatch):
+    monkeypatch.delenv("PROFILE_SAMPLE_RATE", raising=False)
+    monkeypatch.setenv("PROFILE_DIR", str(tmp_path / "profiles"))
+    monkeypatch.setenv("PROFILE_INTERVAL_MS", "1")
+    profile_settings.cache_clear()
+    yield Tracer(MetricsRegistry(), "test")
+    profile_settings.cache_clear()
+
+
+# --- Tests for SamplingProfiler ---
+@pytest.mark.success
+def test_profiler_samples_current_thread(tmp_path):
+    profiler = SamplingProfiler(interval=0.001)
+    profiler.start()
+    busy_work(0.1)
+    profiler.stop()
+
+    assert profiler.samples > 0
+    assert any("busy_work (test_profiling.py:" in stack for stack in profiler.stacks)
+    assert 0 < profiler.overhead_ratio < 1
+
+    path = tmp_path / "out.folded"
+    profiler.write_folded(path)
+    for line in path.read_text().splitlines():
+        stack, count = line.rsplit(" ", 1)
+        assert stack and int(count) > 0
+
+
+@pytest.mark.edge_case
+def test_profiler_stops_at_max_samples():
+    profiler = SamplingProfiler(interval=0.001, max_samples=3)
+    profiler.start()
+    busy_work(0.1)
+    profiler.stop()
+    assert profiler.samples == 3
+
+
+# --- Tests for maybe_profile ---
+@pytest.mark.success
+def test_maybe_profile_forced_writes_profile(tracer, tmp_path):
+    with tracer.span("root", trace_id="trace-1") as span:
+        with maybe_profile(tracer, "trace-1", force=True) as profiler:
+            assert profiler is not None
+            assert is_profiling()
+            busy_work(0.05)
+    assert not is_profiling()
+
+    path = tmp_path / "profiles" / f"test-{otlp_trace_id('trace-1')}.folded"
+    assert path.exists()
+    assert span.attributes["profile.path"] == str(path)
+    assert span.attributes["profile.samples"] == profiler.samples
+    assert tracer.metrics.counter_value("test_profiles_total") == 1
+
+
+@pytest.mark.success
+def test_maybe_profile_disabled_by_default(tracer):
+    with maybe_profile(tracer, "trace-1") as profiler:
+        assert profiler is None
+        assert not is_profiling()
+
+
+@pytest.mark.success
+def test_maybe_profile_sample_rate(tracer, monkeypatch):
+    monkeypatch.setenv("PROFILE_SAMPLE_RATE", "1")
+    profile_settings.cache_clear()
+    with maybe_profile(tracer, "trace-1") as profiler:
+        assert profiler is not None
+
+
+@pytest.mark.edge_case
+def test_only_one_profile_at_a_time(tracer):
+    inner_result = []
+
+    def nested():
+        with maybe_profile(tracer, "trace-2", force=True) as profiler:
+            inner_result.append(profiler)
+
+    with maybe_profile(tracer, "trace-1", force=True) as outer:
+        thread = threading.Thread(target=nested)
+        thread.start()
+        thread.join()
+
+    assert outer is not None
+    assert inner_result == [None]
+
+
+@pytest.mark.edge_case
+def test_profile_path_ignores_trace_id_characters(tracer, tmp_path):
+    with maybe_profile(tracer, "../../escape", force=True):
+        pass
+    (path,) = (tmp_path / "profiles").iterdir()
+    assert path.name == f"test-{otlp_trace_id('../../escape')}.folded"
+
+
+@pytest.mark.error
+def test_invalid_settings_fall_back_to_defaults(tracer, monkeypatch):
+    monkeypatch.setenv("PROFILE_SAMPLE_RATE", "often")
+    monkeypatch.setenv("PROFILE_INTERVAL_MS", "nan")
+    profile_settings.cache_clear()
+
+    assert profile_settings().sample_rate == 0.0
+    assert profile_settings().interval == 0.01
+    with maybe_profile(tracer, "trace-1") as profiler:
+        assert profiler is None
+
+
+@pytest.mark.error
+def test_unwritable_profile_is_counted_not_raised(tracer, tmp_path, monkeypatch):
+    (tmp_path / "file").write_text("")
+    monkeypatch.setenv("PROFILE_DIR", str(tmp_path / "file" / "profiles"))
+    with tracer.span("root") as span:
+        with maybe_profile(tracer, "trace-1", force=True):
+            pass
+
+    assert tracer.metrics.counter_value("test_profile_export_errors_total") == 1
+    assert "profile.path" not in span.attributes
@@ -0,0 +1,329 @@
+import asyncio
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+
+from src.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    LatencyTracker,
+    RetryPolicy,
+    call_with_resilience,
+    retry_after_seconds,
+)
+
+NO_DELAY = RetryPolicy(base_delay=0.0)
+
+
+def make_response(status_code, headers=None):
+    response = MagicMock(spec=httpx.Response)
+    response.status_code = status_code
+    response.headers = headers or {}
+    return response
+
+
+def make_send(*outcomes):
+    """Returns a send() that yields the given responses or raises the given errors."""
+    calls = []
+
+    async def send():
+        outcome = outcomes[len(calls)]
+        calls.append(outcome)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    send.calls = calls
+    return send
+
+
+def connect_error():
+    return httpx.ConnectError("refused", request=httpx.Request("GET", "/"))
+
+
+def read_timeout():
+    return httpx.ReadTimeout("timed out", request=httpx.Request("GET", "/"))
+
+
+# --- Tests for RetryPolicy / LatencyTracker ---
+@pytest.mark.success
+def test_backoff_is_bounded_by_max_delay():
+    policy = RetryPolicy(base_delay=0.5, max_delay=1.0)
+    assert all(0 <= policy.backoff(10) <= 1.0 for _ in range(100))
+
+
+@pytest.mark.success
+def test_latency_tracker_percentile():
+    tracker = LatencyTracker(window=100)
+    for i in range(100):
+        tracker.record(i / 100)
+    assert tracker.percentile(0.95) == 0.95
+
+
+@pytest.mark.edge_case
+def test_latency_tracker_empty():
+    assert LatencyTracker().percentile(0.95) is None
+
+
+# --- Tests for CircuitBreaker ---
+@pytest.mark.success
+def test_circuit_breaker_opens_after_threshold():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+@pytest.mark.success
+def test_circuit_breaker_half_open_allows_single_trial():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == "half_open"
+
+    breaker.before_call()  # The trial call
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.before_call()
+
+
+@pytest.mark.error
+def test_circuit_breaker_failed_trial_reopens():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    breaker.opened_at -= 1  # Pretend the reset timeout elapsed
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+
+# --- Tests for call_with_resilience ---
+async def call(
+    send, idempotent=True, hedgeable=True, policy=NO_DELAY, breaker=None, latency=None
+):
+    return await call_with_resilience(
+        send,
+        idempotent=idempotent,
+        hedgeable=hedgeable,
+        policy=policy,
+        breaker=breaker or CircuitBreaker(),
+        latency=latency or LatencyTracker(),
+    )
+
+
+@pytest.mark.success
+@pytest.mark.asyncio
+async def test_retries_retryable_status_then_succeeds():
+    send = make_send(make_response(503), make_response(200))
+    response = await call(send)
+    assert response.status_code == 200
+    assert len(send.calls) == 2
+
+
+@pytest.mark.error
+@pytest.mark.asyncio
+async def test_client_errors_are_not_retried():
+    send = make_send(make_response(404))
+    response = await call(send)
+    assert response.status_code == 404
+    assert len(send.calls) == 1
+
+
+@pytest.mark.error
+@pytest.mark.asyncio
+async def test_returns_last_response_when_retries_exhausted():
+    send = make_send(make_response(503), make_response(503), make_response(503))
+    response = await call(send)
+    assert response.status_code == 503
+    assert len(send.calls) == 3
+
+
+@pytest.mark.error
+@pytest.mark.asyncio
+async def test_reraises_last_error_when_retries_exhausted():
+    send = make_send(read_timeout(), read_timeout(), read_timeout())
+    with pytest.raises(httpx.ReadTimeout):
+        await call(send)
+    assert len(send.calls) == 3
+
+
+@pytest.mark.success
+@pytest.mark.asyncio
+async def test_non_idempotent_retried_only_when_not_sent():
+    send = make_send(connect_error(), make_response(200))
+    response = await call(send, idempotent=False)
+    assert response.status_code == 200
+
+    send = make_send(read_timeout(), make_response(200))
+    with pytest.raises(httpx.ReadTimeout):
+        await call(send, idempotent=False)
+    assert len(send.calls) == 1
+
+
+@pytest.mark.error
+@pytest.mark.asyncio
+async def test_non_idempotent_not_retried_on_server_error():
+    send = make_send(make_response(503), make_response(200))
+    response = await call(send, idempotent=False)
+    assert response.status_code == 503
+
+
+@pytest.mark.error
+@pytest.mark.asyncio
+async def test_failures_trip_breaker_and_fail_fast():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    send = make_send(connect_error(), connect_error(), make_response(200))
+    with pytest.raises(CircuitOpenError):
+        await call(send, breaker=breaker)
+    assert len(send.calls) == 2
+
+
+@pytest.mark.edge_case
+@pytest.mark.asyncio
+async def test_cancelled_trial_frees_the_half_open_slot():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    started = asyncio.Event()
+
+    async def hang():
+        started.set()
+        await asyncio.sleep(60)
+
+    trial = asyncio.create_task(call(hang, breaker=breaker))
+    await started.wait()
+    trial.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await trial
+
+    response = await call(make_send(make_response(200)), breaker=breaker)
+    assert response.status_code == 200
+    assert breaker.state == "closed"
+
+
+@pytest.mark.edge_case
+@pytest.mark.asyncio
+async def test_unexpected_trial_error_frees_the_half_open_slot():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    with pytest.raises(ValueError):
+        await call(make_send(ValueError("bad body")), breaker=breaker)
+
+    response = await call(make_send(make_response(200)), breaker=breaker)
+    assert response.status_code == 200
+
+
+@pytest.mark.success
+def test_retry_after_seconds_parses_both_forms():
+    assert retry_after_seconds(make_response(429, {"Retry-After": "2"})) == 2.0
+    assert retry_after_seconds(make_response(429)) is None
+    assert retry_after_seconds(make_response(429, {"Retry-After": "soon"})) is None
+    past = make_response(503, {"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})
+    assert retry_after_seconds(past) == 0.0
+
+
+@pytest.mark.success
+@pytest.mark.asyncio
+async def test_retry_after_replaces_backoff(monkeypatch):
+    delays = []
+
+    async def fake_sleep(seconds):
+        delays.append(seconds)
+
+    monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+    send = make_send(make_response(429, {"Retry-After": "3"}), make_response(200))
+    response = await call(send, idempotent=False)
+    assert response.status_code == 200
+    assert delays == [3.0]
+
+
+@pytest.mark.error
+@pytest.mark.asyncio
+async def test_retry_after_beyond_limit_returns_response():
+    send = make_send(make_response(503, {"Retry-After": "120"}), make_response(200))
+    response = await call(send, policy=RetryPolicy(base_delay=0.0, max_retry_after=5))
+    assert response.status_code == 503
+    assert len(send.calls) == 1
+
+
+@pytest.mark.success
+@pytest.mark.asyncio
+async def test_hedged_request_wins_over_slow_primary():
+    latency = LatencyTracker()
+    for _ in range(20):
+        latency.record(0.01)
+    started = []
+
+    async def send():
+        started.append(None)
+        if len(started) == 1:
+            await asyncio.sleep(5)
+            return make_response(500)
+        return make_response(200)
+
+    policy = RetryPolicy(base_delay=0.0, hedge=True, hedge_min_samples=20)
+    response = await asyncio.wait_for(call(send, policy=policy, latency=latency), 1)
+    assert response.status_code == 200
+    assert len(started) == 2
+
+
+@pytest.mark.edge_case
+@pytest.mark.asyncio
+async def test_no_hedging_without_enough_samples():
+    started = []
+
+    async def send():
+        started.append(None)
+        await asyncio.sleep(0.05)
+        return make_response(200)
+
+    policy = RetryPolicy(base_delay=0.0, hedge=True, hedge_min_samples=20)
+    await call(send, policy=policy)
+    assert len(started) == 1
+
+
+@pytest.mark.edge_case
+@pytest.mark.asyncio
+async def test_idempotent_writes_are_never_hedged():
+    latency = LatencyTracker()
+    for _ in range(20):
+        latency.record(0.001)
+    started = []
+
+    async def send():
+        started.append(None)
+        await asyncio.sleep(0.05)
+        return make_response(200)
+
+    policy = RetryPolicy(base_delay=0.0, hedge=True, hedge_min_samples=20)
+    await call(send, hedgeable=False, policy=policy, latency=latency)
+    assert len(started) == 1
+
+
+@pytest.mark.edge_case
+@pytest.mark.asyncio
+async def test_admission_rejections_spare_the_breaker_and_replay_writes():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    queue_full = make_response(503, {"Retry-After": "0"})
+    send = make_send(queue_full, queue_full, make_response(200))
+
+    response = await call(send, idempotent=False, breaker=breaker)
+    assert response.status_code == 200
+    assert len(send.calls) == 3
+    assert breaker.state == "closed"
+
+
+@pytest.mark.error
+@pytest.mark.asyncio
+async def test_plain_503_still_counts_against_the_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    response = await call(
+        make_send(make_response(503)), idempotent=False, breaker=breaker
+    )
+    assert response.status_code == 503
+    assert breaker.state == "open"
@@ -0,0 +1,120 @@
+import pytest
+
+from src.schema_validation import (
+    SCHEMAS_DIR,
+    SchemaValidationError,
+    compile_schema,
+    load_validator,
+)
+
+
+@pytest.mark.success
+def test_valid_document_passes():
+    validate = compile_schema(
+        {
+            "type": "object",
+            "required": ["name"],
+            "properties": {
+                "name": {"type": "string", "minLength": 1},
+                "tags": {"type": "array", "items": {"type": "string"}},
+                "count": {"type": "integer", "minimum": 0},
+            },
+            "additionalProperties": False,
+        }
+    )
+    validate({"name": "x", "tags": ["a"], "count": 0})
+
+
+@pytest.mark.error
+@pytest.mark.parametrize(
+    ("schema", "instance", "message"),
+    [
+        ({"type": "integer"}, True, "expected integer, got bool"),
+        ({"type": "string", "nullable": True}, 1, "expected string or null"),
+        ({"enum": ["a", "b"]}, "c", "'c' is not one of"),
+        ({"const": "1.0"}, "2.0", "expected '1.0'"),
+        ({"required": ["a"]}, {}, "missing required property 'a'"),
+        ({"additionalProperties": False}, {"a": 1}, "unexpected property 'a'"),
+        ({"additionalProperties": {"type": "string"}}, {"a": 1}, "a: expected string"),
+        ({"minItems": 1}, [], "at least 1 items"),
+        ({"uniqueItems": True}, ["a", "a"], "not unique"),
+        ({"maximum": 5}, 6, "greater than 5"),
+        ({"pattern": "^L\\d+-L\\d+$"}, "L1-2", "does not match"),
+    ],
+)
+def test_invalid_document_raises(schema, instance, message):
+    with pytest.raises(SchemaValidationError, match=message):
+        compile_schema(schema)(instance)
+
+
+@pytest.mark.error
+def test_error_reports_path():
+    validate = compile_schema(
+        {
+            "type": "object",
+            "properties": {"items": {"type": "array", "items": {"required": ["id"]}}},
+        }
+    )
+    with pytest.raises(SchemaValidationError) as excinfo:
+        validate({"items": [{"id": 1}, {}]})
+    assert excinfo.value.path == ("items", 1)
+    assert str(excinfo.value).startswith("items/1:")
+
+
+@pytest.mark.success
+def test_one_of_requires_exactly_one_match():
+    validate = compile_schema(
+        {"oneOf": [{"type": "integer"}, {"type": "number", "minimum": 0}]}
+    )
+    validate(-1)
+    validate(0.5)
+    with pytest.raises(SchemaValidationError, match="more than one"):
+        validate(1)
+
+
+@pytest.mark.success
+def test_local_ref_and_recursion():
+    schema = {
+        "$defs": {
+            "node": {
+                "type": "object",
+                "properties": {
+                    "children": {"type": "array", "items": {"$ref": "#/$defs/node"}}
+                },
+                "additionalProperties": False,
+            }
+        },
+        "$ref": "#/$defs/node",
+    }
+    validate = compile_schema(schema)
+    validate({"children": [{"children": []}]})
+    with pytest.raises(SchemaValidationError, match="children/0"):
+        validate({"children": [{"bad": 1}]})
+
+
+@pytest.mark.edge_case
+def test_empty_schema_accepts_anything():
+    validate = compile_schema({})
+    for instance in (None, 1, "x", [], {}):
+        validate(instance)
+
+
+@pytest.mark.success
+@pytest.mark.parametrize("schema_path", sorted(SCHEMAS_DIR.glob("*.schema.json")))
+def test_project_schemas_compile_once(schema_path):
+    validate = load_validator(schema_path.name)
+    assert load_validator(schema_path.name) is validate
+
+
+@pytest.mark.success
+def test_plan_schema():
+    validate = load_validator("plan_v1.schema.json")
+    plan = {
+        "meta": {"version": "1.0", "intent": "demo"},
+        "tasks": [{"id": "t1", "title": "Read", "tool": "read_file", "args": {}}],
+        "on_error": {"policy": "rollback"},
+    }
+    validate(plan)
+    plan["on_error"]["policy"] = "retry"
+    with pytest.raises(SchemaValidationError, match="on_error/policy"):
+        validate(plan)
@@ -0,0 +1,123 @@
+import pytest
+
+from src.main import app
+from src.schema_validation import SCHEMAS_DIR, SchemaValidationError
+from src.tool_registry import build_registry, compile_tools
+
+MCP_URL = "http://mcp"
+RAG_URL = "http://rag"
+
+
+@pytest.fixture(scope="module")
+def registry():
+    return build_registry(
+        [
+            (SCHEMAS_DIR / "mcp_server.openapi.yml", MCP_URL),
+            (SCHEMAS_DIR / "rag_server.openapi.yml", RAG_URL),
+        ]
+    )
+
+
+@pytest.mark.success
+def test_registry_contains_mcp_and_rag_tools(registry):
+    assert {"list_files", "read_file", "write_file", "search"} <= set(registry)
+    assert registry["read_file"].base_url == MCP_URL
+    assert registry["search"].base_url == RAG_URL
+
+
+@pytest.mark.success
+def test_mcp_spec_matches_server_routes(registry):
+    server_paths = app.openapi()["paths"]
+    for name in ("list_files", "grep", "read_file", "write_file"):
+        spec = registry[name]
+        operation = server_paths[spec.path][spec.method]
+        server_query = {
+            p["name"] for p in operation.get("parameters", []) if p["in"] == "query"
+        }
+        assert server_query == spec.query_params
+
+
+@pytest.mark.success
+def test_build_request_splits_query_and_body(registry):
+    args = {"file_path": "a b.txt", "content": "hi", "mode": "append"}
+    request = registry["write_file"].build_request(args)
+
+    assert request.method == "post"
+    assert request.path == "/write_file"
+    assert request.params == {"file_path": "a b.txt", "mode": "append"}
+    assert request.body == {"content": "hi"}
+    assert args == {"file_path": "a b.txt", "content": "hi", "mode": "append"}
+
+
+@pytest.mark.success
+def test_build_request_get_has_no_body(registry):
+    request = registry["list_files"].build_request({"extensions": ".txt"})
+    assert request.method == "get"
+    assert request.params == {"extensions": ".txt"}
+    assert request.body is None
+
+
+@pytest.mark.success
+def test_idempotency_flags(registry):
+    assert registry["read_file"].idempotent
+    assert registry["write_file"].idempotent  # Appends are excluded by the caller
+    assert registry["search"].idempotent
+
+
+@pytest.mark.error
+@pytest.mark.parametrize(
+    ("tool", "args", "message"),
+    [
+        ("read_file", {}, "missing required property 'file_path'"),
+        ("write_file", {"file_path": "a.txt"}, "missing required property 'content'"),
+        ("write_file", {"file_path": "a.txt", "content": 1}, "expected string"),
+        (
+            "write_file",
+            {"file_path": "a.txt", "content": "x", "mode": "prepend"},
+            "is not one of",
+        ),
+        ("list_files", {"max_items": "ten"}, "expected integer"),
+        ("list_files", {"recursive": True}, "unexpected property 'recursive'"),
+        ("search", {"query": "q", "top_k": 100}, "greater than 50"),
+    ],
+)
+def test_build_request_rejects_invalid_args(registry, tool, args, message):
+    with pytest.raises(SchemaValidationError, match=message):
+        registry[tool].build_request(args)
+
+
+@pytest.mark.success
+def test_decode_non_json_response_returns_empty(registry):
+    assert registry["write_file"].decode(b"File written successfully") == {}
+    assert registry["read_file"].decode(b'{"content": "x"}') == {"content": "x"}
+
+
+@pytest.mark.success
+def test_compile_tools_path_params_and_operation_id_fallback():
+    document = {
+        "paths": {
+            "/items/{item_id}": {
+                "get": {
+                    "parameters": [
+                        {
+                            "name": "item_id",
+                            "in": "path",
+                            "required": True,
+                            "schema": {"type": "string"},
+                        }
+                    ],
+                    "responses": {"200": {"description": "OK"}},
+                }
+            }
+        }
+    }
+    tools = compile_tools(document, "http://x")
+    request = tools["{item_id}"].build_request({"item_id": "a/b"})
+    assert request.path == "/items/a%2Fb"
+
+
+@pytest.mark.error
+def test_build_registry_rejects_duplicate_names():
+    mcp = SCHEMAS_DIR / "mcp_server.openapi.yml"
+    with pytest.raises(ValueError, match="Duplicate tool name"):
+        build_registry([(mcp, MCP_URL), (mcp, MCP_URL)])
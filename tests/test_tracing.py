@@ -0,0 +1,141 @@
+import asyncio
+import json
+
+import pytest
+
+from src.tracing import MetricsRegistry, Tracer, create_tracer, otlp_trace_id
+
+
+@pytest.fixture
+def tracer(tmp_path):
+    return Tracer(MetricsRegistry(), "test", trace_file=str(tmp_path / "trace.jsonl"))
+
+
+def read_spans(tracer):
+    spans = []
+    with open(tracer.trace_file, encoding="utf-8") as f:
+        for line in f:
+            for resource in json.loads(line)["resourceSpans"]:
+                for scope in resource["scopeSpans"]:
+                    spans.extend(scope["spans"])
+    return spans
+
+
+# --- Tests for spans ---
+@pytest.mark.success
+def test_nested_spans_share_trace_and_parent(tracer):
+    with tracer.span("root", trace_id="trace-1") as root:
+        with tracer.span("child") as child:
+            assert tracer.current_trace_id() == "trace-1"
+
+    assert child.trace_id == "trace-1"
+    assert child.parent_span_id == root.span_id
+    assert root.parent_span_id is None
+    assert tracer.current_trace_id() is None
+
+
+@pytest.mark.success
+@pytest.mark.asyncio
+async def test_spans_in_concurrent_tasks_have_same_parent(tracer):
+    async def work(name):
+        with tracer.span(name) as span:
+            await asyncio.sleep(0)
+        return span
+
+    with tracer.span("root", trace_id="trace-1") as root:
+        spans = await asyncio.gather(work("a"), work("b"))
+
+    assert {span.parent_span_id for span in spans} == {root.span_id}
+
+
+@pytest.mark.error
+def test_span_records_error_and_reraises(tracer):
+    with pytest.raises(ValueError):
+        with tracer.span("failing"):
+            raise ValueError("boom")
+    tracer.flush()
+
+    (span,) = read_spans(tracer)
+    assert span["status"] == {"code": 2, "message": "ValueError: boom"}
+
+
+@pytest.mark.success
+def test_flush_writes_otlp_json_lines(tracer):
+    trace_id = "0af7651916cd43dd8448eb211c80319c"
+    with tracer.span("root", trace_id=trace_id, tool="read_file"):
+        with tracer.span("child"):
+            pass
+    tracer.flush()
+    tracer.flush()  # Nothing buffered, nothing written
+
+    with open(tracer.trace_file, encoding="utf-8") as f:
+        assert len(f.readlines()) == 1
+    child, root = read_spans(tracer)
+    assert root["traceId"] == trace_id
+    assert child["parentSpanId"] == root["spanId"]
+    assert {"key": "tool", "value": {"stringValue": "read_file"}} in root["attributes"]
+    assert int(root["endTimeUnixNano"]) >= int(root["startTimeUnixNano"])
+
+
+@pytest.mark.edge_case
+def test_no_buffering_without_trace_file():
+    tracer = Tracer(MetricsRegistry(), "test")
+    with tracer.span("root"):
+        pass
+    tracer.flush()
+    assert (
+        tracer.metrics.histogram_count("test_span_duration_seconds", span="root") == 1
+    )
+
+
+@pytest.mark.error
+def test_failed_flush_is_counted_not_raised(tmp_path):
+    tracer = Tracer(MetricsRegistry(), "test", trace_file=str(tmp_path))
+    with tracer.span("root"):
+        pass
+    tracer.flush()  # A directory cannot be opened for appending
+
+    assert tracer.metrics.counter_value("test_trace_export_errors_total") == 1
+    assert tracer.metrics.counter_value("test_trace_spans_dropped_total") == 1
+
+
+@pytest.mark.edge_case
+def test_empty_trace_file_means_unset(monkeypatch):
+    monkeypatch.setenv("TRACE_FILE", "")
+    assert create_tracer("test").trace_file is None
+
+
+@pytest.mark.edge_case
+def test_otlp_trace_id():
+    assert otlp_trace_id("0AF76519-16CD-43DD-8448-EB211C80319C") == (
+        "0af7651916cd43dd8448eb211c80319c"
+    )
+    hashed = otlp_trace_id("12345-abcde")
+    assert len(hashed) == 32 and hashed == otlp_trace_id("12345-abcde")
+
+
+# --- Tests for MetricsRegistry ---
+@pytest.mark.success
+def test_render_prometheus():
+    metrics = MetricsRegistry(buckets=(0.1, 1.0))
+    metrics.inc("requests_total", endpoint="/read_file", status="200")
+    metrics.inc("requests_total", endpoint="/read_file", status="200")
+    metrics.observe("latency_seconds", 0.05, endpoint="/read_file")
+    metrics.observe("latency_seconds", 0.5, endpoint="/read_file")
+    metrics.observe("latency_seconds", 5, endpoint="/read_file")
+
+    text = metrics.render_prometheus()
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{endpoint="/read_file",status="200"} 2' in text
+    assert "# TYPE latency_seconds histogram" in text
+    assert 'latency_seconds_bucket{endpoint="/read_file",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{endpoint="/read_file",le="1"} 2' in text
+    assert 'latency_seconds_bucket{endpoint="/read_file",le="+Inf"} 3' in text
+    assert 'latency_seconds_count{endpoint="/read_file"} 3' in text
+
+
+@pytest.mark.edge_case
+def test_label_values_are_escaped():
+    metrics = MetricsRegistry()
+    metrics.inc("c", path='a"b\\c')
+    assert 'c{path="a\\"b\\\\c"} 1' in metrics.render_prometheus()
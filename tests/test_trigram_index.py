@@ -0,0 +1,172 @@
+import os
+import re
+
+import pytest
+
+from src.trigram_index import TrigramIndex, required_literals
+
+
+@pytest.fixture
+def root(tmp_path):
+    root = tmp_path / "data"
+    (root / "src").mkdir(parents=True)
+    (root / "src" / "app.py").write_text(
+        "import os\n\ndef handler(event):\n    return process_event(event)\n"
+    )
+    (root / "notes.md").write_text("TODO: process_event retries\nnothing else\n")
+    (root / "image.bin").write_text("process_event")  # Extension not indexed
+    return root
+
+
+def make_index(root, index_file=None):
+    return TrigramIndex(root, index_file, {".py", ".md", ".txt"}, 1024 * 1024)
+
+
+# --- Tests for required_literals ---
+@pytest.mark.success
+def test_required_literals_from_regex():
+    assert required_literals("def \\w+_event\\(", regex=True) == ["def ", "_event("]
+    assert required_literals("handler", regex=False) == ["handler"]
+
+
+@pytest.mark.edge_case
+def test_required_literals_cannot_narrow():
+    assert required_literals("foo|bar", regex=True) == []
+    assert required_literals("[a-z]+", regex=True) == []
+    assert required_literals("ab", regex=False) == []
+    assert required_literals("(unclosed", regex=True) == []
+
+
+# --- Tests for TrigramIndex ---
+@pytest.mark.success
+def test_search_literal_returns_line_spans(root):
+    index = make_index(root)
+    assert index.refresh() == 2
+
+    matches, truncated = index.search("process_event")
+    assert not truncated
+    assert [(m.path, m.span, m.text) for m in matches] == [
+        ("notes.md", "L1-L1", "TODO: process_event retries"),
+        (os.path.join("src", "app.py"), "L4-L4", "    return process_event(event)"),
+    ]
+
+
+@pytest.mark.success
+def test_search_regex_and_ignore_case(root):
+    index = make_index(root)
+    index.refresh()
+
+    (match,) = index.search(r"def \w+\(event\):\n\s+return", regex=True)[0]
+    assert match.span == "L3-L4"
+    assert [m.path for m in index.search("todo", ignore_case=True)[0]] == ["notes.md"]
+    assert index.search("todo")[0] == []
+
+
+@pytest.mark.edge_case
+def test_search_filters_prefix_and_truncates(root):
+    index = make_index(root)
+    index.refresh()
+
+    matches = index.search("event", path_prefix="src")[0]
+    assert [(m.path, m.span) for m in matches] == [
+        (os.path.join("src", "app.py"), "L3-L3"),
+        (os.path.join("src", "app.py"), "L4-L4"),
+    ]
+    matches, truncated = index.search("event", max_results=1)
+    assert len(matches) == 1
+    assert truncated
+
+
+@pytest.mark.error
+def test_search_invalid_regex_raises(root):
+    index = make_index(root)
+    index.refresh()
+    with pytest.raises(re.error):
+        index.search("(unclosed", regex=True)
+
+
+@pytest.mark.error
+def test_symlinks_out_of_root_are_not_searched(root, tmp_path):
+    outside = tmp_path / "outside"
+    outside.mkdir()
+    (outside / "secret.txt").write_text("SECRET_TOKEN=abc123\n")
+    (root / "link.txt").symlink_to(outside / "secret.txt")
+    (root / "inner.txt").symlink_to(root / "notes.md")
+    index = make_index(root)
+    index.refresh()
+    index.update_file("link.txt")
+
+    assert index.search("SECRET_TOKEN") == ([], False)
+    # A link that stays inside root is searched like any other file
+    assert [m.path for m in index.search("TODO")[0]] == ["inner.txt", "notes.md"]
+
+
+@pytest.mark.success
+def test_update_file_and_refresh_track_changes(root):
+    index = make_index(root)
+    index.refresh()
+
+    (root / "new.txt").write_text("fresh needle\n")
+    index.update_file("new.txt")
+    assert [m.path for m in index.search("needle")[0]] == ["new.txt"]
+
+    (root / "notes.md").write_text("rewritten\n")
+    (root / "src" / "app.py").unlink()
+    assert index.refresh() == 2
+    assert index.search("process_event")[0] == []
+    assert len(index) == 2
+
+
+@pytest.mark.success
+def test_index_is_persisted(root, tmp_path):
+    index_file = tmp_path / "index.pickle"
+    make_index(root, index_file).refresh()
+    assert index_file.exists()
+
+    restored = make_index(root, index_file)
+    assert restored.load()
+    assert len(restored) == 2
+    assert restored.refresh() == 0  # Nothing changed, nothing re-read
+    assert [m.path for m in restored.search("retries")[0]] == ["notes.md"]
+
+    assert not make_index(root / "src", index_file).load()  # Other root
+
+
+@pytest.mark.success
+def test_first_refresh_starts_from_the_saved_index(root, tmp_path):
+    index_file = tmp_path / "index.pickle"
+    make_index(root, index_file).refresh()
+
+    restored = make_index(root, index_file)
+    assert restored.refresh() == 0  # Loaded, so nothing is re-read
+    assert restored.wait_ready(0)
+
+
+@pytest.mark.edge_case
+def test_saves_are_debounced(root, tmp_path, monkeypatch):
+    index_file = tmp_path / "index.pickle"
+    index = make_index(root, index_file)
+    index.refresh()
+    saved = index_file.read_bytes()
+
+    (root / "new.txt").write_text("fresh text")
+    assert index.refresh() == 1
+    assert index_file.read_bytes() == saved
+
+    monkeypatch.setattr("src.trigram_index.SAVE_INTERVAL_SECONDS", 0.0)
+    index.refresh()
+    assert index_file.read_bytes() != saved
+
+
+@pytest.mark.edge_case
+def test_compaction_keeps_results(root):
+    index = make_index(root)
+    index.refresh()
+    for i in range(2000):
+        (root / "notes.md").write_text(f"version {i} process_event\n")
+        index.update_file("notes.md")
+    index.refresh()
+    assert len(index._paths) < 100
+    assert [m.text for m in index.search("version 1999")[0]] == [
+        "version 1999 process_event"
+    ]
@@ -0,0 +1,84 @@
+import gzip
+
+import pytest
+
+msgpack = pytest.importorskip("msgpack")
+zstandard = pytest.importorskip("zstandard")
+
+import src.wire as wire_module  # noqa: E402
+from src.wire import (  # noqa: E402
+    COMPRESSION_MIN_BYTES,
+    JSON_MEDIA_TYPE,
+    MSGPACK_MEDIA_TYPE,
+    WireFormat,
+    accept_header,
+    compress,
+    decode,
+    encode,
+    negotiate,
+)
+
+
+# --- Tests for negotiate ---
+@pytest.mark.success
+def test_negotiate_prefers_msgpack_and_zstd():
+    wire = negotiate(accept_header(), "gzip, deflate, zstd")
+    assert wire == WireFormat(MSGPACK_MEDIA_TYPE, "zstd")
+
+
+@pytest.mark.success
+def test_negotiate_defaults_to_plain_json():
+    assert negotiate(None, None) == WireFormat(JSON_MEDIA_TYPE, None)
+    assert negotiate("*/*", "identity") == WireFormat(JSON_MEDIA_TYPE, None)
+
+
+@pytest.mark.edge_case
+def test_negotiate_honors_q_values():
+    wire = negotiate(
+        "application/json, application/msgpack;q=0.5", "zstd;q=0.1, gzip;q=0.8"
+    )
+    assert wire == WireFormat(JSON_MEDIA_TYPE, "gzip")
+    assert negotiate(None, "gzip;q=0").encoding is None
+
+
+@pytest.mark.edge_case
+def test_negotiate_without_optional_packages(monkeypatch):
+    monkeypatch.setattr(wire_module, "msgpack", None)
+    monkeypatch.setattr(wire_module, "zstandard", None)
+    assert negotiate(MSGPACK_MEDIA_TYPE, "zstd, gzip") == WireFormat(
+        JSON_MEDIA_TYPE, "gzip"
+    )
+    assert accept_header() == JSON_MEDIA_TYPE
+
+
+# --- Tests for compress / encode / decode ---
+@pytest.mark.success
+def test_compress_above_threshold_only():
+    small = b"x" * (COMPRESSION_MIN_BYTES - 1)
+    assert compress(small, "gzip") == (small, None)
+
+    large = b"x" * COMPRESSION_MIN_BYTES * 4
+    body, encoding = compress(large, "gzip")
+    assert encoding == "gzip"
+    assert gzip.decompress(body) == large
+
+    body, encoding = compress(large, "zstd")
+    assert encoding == "zstd"
+    assert zstandard.ZstdDecompressor().decompress(body) == large
+
+
+@pytest.mark.success
+def test_round_trip_both_media_types():
+    payload = {"content": 'こんにちは\n"quoted"'}
+    for media_type in (JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE):
+        body = encode(payload, WireFormat(media_type))
+        assert decode(body, f"{media_type}; charset=utf-8") == payload
+    assert msgpack.unpackb(encode(payload, WireFormat(MSGPACK_MEDIA_TYPE))) == payload
+
+
+@pytest.mark.error
+def test_decode_msgpack_without_package(monkeypatch):
+    body = encode({"files": []}, WireFormat(MSGPACK_MEDIA_TYPE))
+    monkeypatch.setattr(wire_module, "msgpack", None)
+    with pytest.raises(ValueError, match="msgpack is not installed"):
+        decode(body, MSGPACK_MEDIA_TYPE)